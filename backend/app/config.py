@@ -13,6 +13,30 @@ class Settings(BaseSettings):
     
     # PokéAPI Configuration
     pokeapi_base_url: str = "https://pokeapi.co/api/v2"
+    pokeapi_timeout_seconds: float = 10.0
+    pokeapi_connect_timeout_seconds: float = 5.0
+    pokeapi_max_connections: int = 100
+    pokeapi_max_keepalive_connections: int = 20
+    pokeapi_max_concurrency_per_host: int = 50
+
+    # In-process Pokemon cache (L1, in front of the pokemon_cache table)
+    pokemon_memory_cache_size: int = 2048
+    pokemon_memory_cache_ttl_seconds: float = 3600.0
+
+    # pokemon_cache expiry: entries older than the soft TTL are served stale
+    # and refreshed in the background; entries older than the hard TTL are dropped
+    pokemon_cache_soft_ttl_hours: float = 24.0
+    pokemon_cache_hard_ttl_hours: float = 720.0
+    pokemon_cache_stale_while_revalidate: bool = True
+
+    # Local Pokemon name index used by search
+    pokemon_index_path: str = "./data/pokemon_index.json"
+    pokemon_index_refresh_hours: int = 168
+
+    # Content-addressed store for generated images (served at /api/images)
+    image_store_path: str = "./data/images"
+    # Worker processes rendering downscaled WebP variants (128/256/512 px)
+    image_variant_workers: int = 2
     
     # CORS Configuration
     cors_origins: str = "http://localhost:5173"
@@ -21,8 +45,36 @@ class Settings(BaseSettings):
     langchain_tracing_v2: bool = False
     langchain_api_key: str = ""
 
+    # Recipe response cache: each preference combination collects up to
+    # recipe_cache_variants generated recipes, then cached ones are reused
+    recipe_cache_enabled: bool = True
+    recipe_cache_variants: int = 3
+    recipe_cache_max_keys: int = 1000
+    recipe_cache_ttl_hours: float = 168.0
+
     # OpenAI Budget Configuration
     openai_budget_limit: float = 50.0
+    # Estimated cost reserved against the budget while a request runs
+    budget_recipe_estimate_usd: float = 0.02
+    budget_image_estimate_usd: float = 0.04
+
+    # Usage records are buffered and written in batches off the request path
+    usage_flush_batch_size: int = 50
+    usage_flush_interval_seconds: float = 1.0
+    # A failed batch is retried with exponential backoff, then re-queued
+    usage_flush_max_attempts: int = 3
+    usage_flush_backoff_seconds: float = 0.5
+
+    # Background image generation jobs (POST /recipes/{id}/generate-image)
+    image_job_workers: int = 2
+    image_job_max_pending: int = 50
+    image_job_max_attempts: int = 3
+    image_job_backoff_seconds: float = 5.0
+
+    # LangGraph checkpoints of interrupted recipe workflow runs, resumable by run_id
+    workflow_checkpoint_path: str = "./data/workflow_checkpoints.db"
+    # Checkpoints of runs never resumed are deleted after this long (checked at startup)
+    workflow_checkpoint_ttl_hours: float = 168.0
     
     @property
     def cors_origins_list(self) -> List[str]:
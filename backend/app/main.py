@@ -1,9 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
 from .database import init_db, SessionLocal
 from .routes import api_router
-from .seed_data import seed_database
+from .workflows import open_workflow_checkpoints, close_workflow_checkpoints
+from .seed_data import seed_database, externalize_recipe_images
+from .services.pokeapi import pokeapi_service
+from .services.usage_tracker import usage_tracker
+from .services.image_variants import image_variants
+from .services.image_jobs import image_job_queue
 from .utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -30,19 +36,43 @@ async def startup_event():
     """Initialize database on startup."""
     init_db()
     print("✅ Database initialized")
+
+    # Backfill usage rollups for records written before they existed
+    usage_tracker.ensure_rollups()
     
-    # Seed database with default recipes if empty
+    # Seed database with default recipes if empty and move inline images to the blob store
     db = SessionLocal()
     try:
         seed_database(db)
+        externalize_recipe_images(db)
     except Exception as e:
         logger.error(f"Error seeding database: {e}")
     finally:
         db.close()
     
+    # Keep the local Pokemon name index built and refreshed in the background
+    app.state.name_index_task = asyncio.create_task(pokeapi_service.run_name_index_refresher())
+
+    # Checkpoint recipe workflow runs so failed ones can be resumed by run_id
+    await open_workflow_checkpoints()
+
+    # Start the image job workers, resuming jobs interrupted by the last shutdown
+    await image_job_queue.start()
+
     print(f"✅ CORS enabled for: {settings.cors_origins_list}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and workers, flush buffered usage and release pooled HTTP connections."""
+    app.state.name_index_task.cancel()
+    await image_job_queue.stop()
+    await close_workflow_checkpoints()
+    usage_tracker.close()
+    image_variants.shutdown()
+    await pokeapi_service.aclose()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -1,12 +1,22 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, UniqueConstraint
 from datetime import datetime
 from .database import Base
 
 
+# Columns read by the summary list view besides the keyset columns; the
+# pagination indexes include them so a summary page never reads the table
+RECIPE_SUMMARY_INDEX_COLUMNS = ("pokemon_name", "recipe_title", "description", "difficulty", "prep_time", "image_url")
+
+
 class Recipe(Base):
     """Recipe model for storing generated dessert recipes."""
     
     __tablename__ = "recipes"
+    __table_args__ = (
+        # Keyset pagination of the recipe list, newest first (covering for view=summary)
+        Index("ix_recipes_summary_created_at_id", "created_at", "id", "pokemon_id", *RECIPE_SUMMARY_INDEX_COLUMNS),
+        Index("ix_recipes_summary_pokemon_id_created_at_id", "pokemon_id", "created_at", "id", *RECIPE_SUMMARY_INDEX_COLUMNS),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     pokemon_id = Column(Integer, nullable=False, index=True)
@@ -73,6 +83,7 @@ class OpenAIUsage(Base):
     completion_tokens = Column(Integer, default=0)
     total_tokens = Column(Integer, nullable=False)
     cost_usd = Column(Float, nullable=False)
+    latency_ms = Column(Integer, nullable=True)
     recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="SET NULL"), nullable=True, index=True)
     pokemon_id = Column(Integer, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -87,7 +98,108 @@ class OpenAIUsage(Base):
             "completion_tokens": self.completion_tokens,
             "total_tokens": self.total_tokens,
             "cost_usd": self.cost_usd,
+            "latency_ms": self.latency_ms,
             "recipe_id": self.recipe_id,
             "pokemon_id": self.pokemon_id,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
+
+
+class UsageRollup(Base):
+    """Usage totals per time bucket, model and request type, maintained on write."""
+
+    __tablename__ = "usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("period", "bucket_start", "model", "request_type", name="uq_usage_rollup_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String(10), nullable=False)  # hour|day|all
+    bucket_start = Column(DateTime, nullable=False)
+    model = Column(String(50), nullable=False)
+    request_type = Column(String(50), nullable=False)
+    requests = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    latency_ms_total = Column(Integer, nullable=False, default=0)
+    latency_count = Column(Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert model to dictionary."""
+        return {
+            "period": self.period,
+            "bucket_start": self.bucket_start.isoformat() if self.bucket_start else None,
+            "model": self.model,
+            "request_type": self.request_type,
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": self.cost_usd,
+            "avg_latency_ms": round(self.latency_ms_total / self.latency_count) if self.latency_count else None
+        }
+
+
+class PregenerationJob(Base):
+    """Checkpoint for one recipe of a bulk pre-generation batch."""
+
+    __tablename__ = "pregeneration_jobs"
+    __table_args__ = (
+        UniqueConstraint("batch", "pokemon_id", "prefs_key", name="uq_pregeneration_job"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch = Column(String(100), nullable=False, index=True)
+    pokemon_id = Column(Integer, nullable=False)
+    prefs_key = Column(String(500), nullable=False)  # Canonical JSON of preferences
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending|running|done|failed
+    attempts = Column(Integer, nullable=False, default=0)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="SET NULL"), nullable=True)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert model to dictionary."""
+        return {
+            "id": self.id,
+            "batch": self.batch,
+            "pokemon_id": self.pokemon_id,
+            "prefs_key": self.prefs_key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "recipe_id": self.recipe_id,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class ImageJob(Base):
+    """Background image generation for a recipe, persisted so it survives restarts."""
+
+    __tablename__ = "image_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending|running|done|failed
+    attempts = Column(Integer, nullable=False, default=0)
+    quality = Column(String(20))  # Quality of the attempt that produced the image
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert model to dictionary."""
+        return {
+            "id": self.id,
+            "recipe_id": self.recipe_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "quality": self.quality,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
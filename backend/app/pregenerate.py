@@ -0,0 +1,294 @@
+"""
+Bulk pre-generation of the recipe library.
+
+Runs the recipe workflow for every (Pokemon ID, preference combo) pair of a
+named batch. Progress is checkpointed in the pregeneration_jobs table, so
+re-running the same batch resumes where it stopped. The run stops as soon
+as the recorded OpenAI spend reaches openai_budget_limit (tracked in
+memory by budget_guard, seeded once from the usage table).
+
+Usage:
+    python -m app.pregenerate --batch launch                        # IDs 1-1017, no preferences
+    python -m app.pregenerate --batch launch --start 1 --end 151 --concurrency 4
+    python -m app.pregenerate --batch vegan --ids 1,4,7 --prefs '{"dietary": "vegano"}'
+    python -m app.pregenerate --batch launch --retry-failed         # retry exhausted jobs
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from .config import settings
+from .database import init_db, SessionLocal
+from .models import PregenerationJob
+from .services.budget_guard import budget_guard
+from .services.pokeapi import pokeapi_service
+from .services.usage_tracker import usage_tracker
+from .workflows import generate_recipe_workflow, open_workflow_checkpoints, close_workflow_checkpoints
+from .utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MAX_POKEMON_ID = 1017
+PROGRESS_EVERY = 25
+
+
+class BudgetExhausted(Exception):
+    """Raised when the recorded spend reaches the configured budget."""
+
+
+def prefs_key_for(preferences: Dict[str, Any]) -> str:
+    """Canonical JSON used to identify a preference combo."""
+    return json.dumps(preferences, ensure_ascii=False, sort_keys=True)
+
+
+def enqueue_jobs(batch: str, pokemon_ids: List[int], prefs_list: List[Dict[str, Any]]) -> int:
+    """Create checkpoint rows for pairs not yet in the batch; return how many were added."""
+    db = SessionLocal()
+    try:
+        existing = {
+            (pokemon_id, prefs_key)
+            for pokemon_id, prefs_key in db.query(PregenerationJob.pokemon_id, PregenerationJob.prefs_key)
+            .filter(PregenerationJob.batch == batch)
+        }
+        added = 0
+        for preferences in prefs_list:
+            prefs_key = prefs_key_for(preferences)
+            for pokemon_id in pokemon_ids:
+                if (pokemon_id, prefs_key) in existing:
+                    continue
+                db.add(PregenerationJob(batch=batch, pokemon_id=pokemon_id, prefs_key=prefs_key))
+                added += 1
+        db.commit()
+        return added
+    finally:
+        db.close()
+
+
+def claimable_jobs(batch: str, max_attempts: int, retry_failed: bool) -> List[Dict[str, Any]]:
+    """
+    Return the batch's unfinished jobs.
+
+    Jobs left "running" by an interrupted run are put back to pending first.
+    """
+    db = SessionLocal()
+    try:
+        jobs = db.query(PregenerationJob).filter(PregenerationJob.batch == batch)
+        jobs.filter(PregenerationJob.status == "running").update(
+            {"status": "pending"}, synchronize_session=False
+        )
+        if retry_failed:
+            jobs.filter(PregenerationJob.status == "failed").update(
+                {"status": "pending", "attempts": 0}, synchronize_session=False
+            )
+        db.commit()
+
+        rows = jobs.filter(
+            PregenerationJob.status == "pending",
+            PregenerationJob.attempts < max_attempts
+        ).order_by(PregenerationJob.id).all()
+        return [
+            {"id": row.id, "pokemon_id": row.pokemon_id, "prefs_key": row.prefs_key, "attempts": row.attempts}
+            for row in rows
+        ]
+    finally:
+        db.close()
+
+
+def update_job(job_id: int, **fields):
+    """Persist a job checkpoint."""
+    db = SessionLocal()
+    try:
+        fields["updated_at"] = datetime.utcnow()
+        db.query(PregenerationJob).filter(PregenerationJob.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def batch_status(batch: str) -> Dict[str, int]:
+    """Count the batch's jobs by status."""
+    db = SessionLocal()
+    try:
+        rows = db.query(PregenerationJob.status, func.count(PregenerationJob.id)).filter(
+            PregenerationJob.batch == batch
+        ).group_by(PregenerationJob.status).all()
+        return {status: count for status, count in rows}
+    finally:
+        db.close()
+
+
+def check_budget(budget: float):
+    """Raise BudgetExhausted once the recorded spend reaches the budget."""
+    spent = budget_guard.spent()
+    if spent >= budget:
+        raise BudgetExhausted(f"Spent ${spent:.2f} of ${budget:.2f} budget")
+
+
+async def run_job(
+    job: Dict[str, Any],
+    budget: float,
+    max_attempts: int,
+    backoff_seconds: float,
+    generate_image: bool
+) -> bool:
+    """Run one job with retries and exponential backoff; return True on success."""
+    preferences = json.loads(job["prefs_key"]) or None
+    attempts = job["attempts"]
+
+    while attempts < max_attempts:
+        check_budget(budget)
+        attempts += 1
+        update_job(job["id"], status="running", attempts=attempts)
+
+        try:
+            # Retries resume the checkpointed run instead of paying for finished steps again
+            result = await generate_recipe_workflow(
+                job["pokemon_id"], preferences, generate_image, run_id=f"pregenerate-{job['id']}"
+            )
+            error = "; ".join(result.get("errors") or []) or (None if result.get("recipe_id") else "No recipe saved")
+        except Exception as e:
+            error = str(e)
+
+        if error is None:
+            update_job(job["id"], status="done", recipe_id=result["recipe_id"], last_error=None)
+            return True
+
+        exhausted = attempts >= max_attempts
+        update_job(job["id"], status="failed" if exhausted else "pending", last_error=error)
+        logger.warning(
+            f"Pokemon {job['pokemon_id']} {job['prefs_key']} attempt {attempts}/{max_attempts} failed: {error}"
+        )
+        if not exhausted:
+            delay = backoff_seconds * 2 ** (attempts - 1)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    return False
+
+
+async def run_batch(
+    jobs: List[Dict[str, Any]],
+    concurrency: int,
+    budget: float,
+    max_attempts: int,
+    backoff_seconds: float,
+    generate_image: bool
+) -> Dict[str, Any]:
+    """Run jobs with bounded concurrency until done or the budget is exhausted."""
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    stats = {"total": len(jobs), "done": 0, "succeeded": 0, "failed": 0, "budget_exhausted": False}
+    started = time.monotonic()
+
+    async def worker(job: Dict[str, Any]):
+        async with semaphore:
+            if stop.is_set():
+                return
+            try:
+                succeeded = await run_job(job, budget, max_attempts, backoff_seconds, generate_image)
+            except BudgetExhausted as e:
+                if not stop.is_set():
+                    logger.warning(f"⛔ Stopping batch: {e}")
+                stats["budget_exhausted"] = True
+                stop.set()
+                # Leave the job resumable for a later run with more budget
+                update_job(job["id"], status="pending")
+                return
+
+        stats["done"] += 1
+        stats["succeeded" if succeeded else "failed"] += 1
+        if stats["done"] % PROGRESS_EVERY == 0 or stats["done"] == stats["total"]:
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Processed {stats['done']}/{stats['total']} jobs "
+                f"({stats['failed']} failed, {elapsed:.1f}s)"
+            )
+
+    await open_workflow_checkpoints()
+    try:
+        await asyncio.gather(*(worker(job) for job in jobs))
+    finally:
+        await close_workflow_checkpoints()
+        await pokeapi_service.aclose()
+    return stats
+
+
+def parse_ids(value: str) -> List[int]:
+    """Parse a comma-separated list of IDs and ID ranges (e.g. "1,4,7-9")."""
+    pokemon_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            pokemon_ids.extend(range(int(start), int(end) + 1))
+        else:
+            pokemon_ids.append(int(part))
+    return pokemon_ids
+
+
+def load_prefs(values: Optional[List[str]], path: Optional[str]) -> List[Dict[str, Any]]:
+    """Collect preference combos from --prefs values and a --prefs-file JSON list."""
+    prefs_list = [json.loads(value) for value in values or []]
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            prefs_list.extend(json.load(f))
+    return prefs_list or [{}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate recipes for a range of Pokemon.")
+    parser.add_argument("--batch", required=True, help="Batch name used to checkpoint and resume progress")
+    parser.add_argument("--start", type=int, default=1, help="First Pokemon ID (default: 1)")
+    parser.add_argument("--end", type=int, default=MAX_POKEMON_ID, help=f"Last Pokemon ID (default: {MAX_POKEMON_ID})")
+    parser.add_argument("--ids", help="Comma-separated Pokemon IDs or ranges, overrides --start/--end")
+    parser.add_argument("--prefs", action="append", help="Preference combo as JSON (repeatable)")
+    parser.add_argument("--prefs-file", help="JSON file with a list of preference combos")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel workflows (default: 4)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per recipe (default: 3)")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Initial retry delay in seconds (default: 2)")
+    parser.add_argument("--budget", type=float, default=settings.openai_budget_limit,
+                        help=f"Stop once total spend reaches this many USD (default: {settings.openai_budget_limit})")
+    parser.add_argument("--with-images", action="store_true", help="Also generate an image for each recipe")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry jobs that exhausted their attempts")
+    args = parser.parse_args()
+
+    init_db()
+    usage_tracker.ensure_rollups()
+    pokemon_ids = parse_ids(args.ids) if args.ids else list(range(args.start, args.end + 1))
+    added = enqueue_jobs(args.batch, pokemon_ids, load_prefs(args.prefs, args.prefs_file))
+    if added:
+        logger.info(f"Added {added} jobs to batch '{args.batch}'")
+
+    jobs = claimable_jobs(args.batch, args.max_attempts, args.retry_failed)
+    if not jobs:
+        logger.info(f"Batch '{args.batch}' has nothing left to do: {batch_status(args.batch)}")
+        return
+
+    try:
+        check_budget(args.budget)
+    except BudgetExhausted as e:
+        logger.warning(f"⛔ Not starting batch: {e}")
+        return
+
+    logger.info(f"Running {len(jobs)} jobs of batch '{args.batch}' with concurrency {args.concurrency}")
+    stats = asyncio.run(run_batch(
+        jobs,
+        concurrency=max(1, args.concurrency),
+        budget=args.budget,
+        max_attempts=max(1, args.max_attempts),
+        backoff_seconds=args.backoff,
+        generate_image=args.with_images
+    ))
+    logger.info(
+        f"🎉 Batch '{args.batch}' run finished: {stats['succeeded']} generated, {stats['failed']} failed"
+        f"{', stopped by budget' if stats['budget_exhausted'] else ''}. Status: {batch_status(args.batch)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
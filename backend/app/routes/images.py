@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from ..services.blob_store import image_blob_store
+from ..services.image_variants import image_variants, VARIANT_WIDTHS
+
+router = APIRouter()
+
+# Blobs are content-addressed, so a URL always maps to the same bytes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match matches etag."""
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+@router.get("/{digest}")
+async def get_image(digest: str, request: Request):
+    """
+    Serve a stored image by its SHA-256 digest.
+
+    Supports conditional requests (ETag / If-None-Match) and byte ranges.
+
+    Args:
+        digest: Hex SHA-256 of the image bytes
+        request: Incoming request
+
+    Returns:
+        The image file, or 304 if the client's copy is current
+    """
+    if not image_blob_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        image_blob_store.path_for(digest),
+        media_type=image_blob_store.media_type(digest),
+        headers=headers
+    )
+
+
+@router.get("/{digest}/{width}.webp")
+async def get_image_variant(digest: str, width: int, request: Request):
+    """
+    Serve a downscaled WebP variant of a stored image.
+
+    Variants are normally rendered when the image is saved; a missing one is
+    rendered on first request.
+
+    Args:
+        digest: Hex SHA-256 of the original image
+        width: Variant size in pixels (128, 256 or 512)
+        request: Incoming request
+
+    Returns:
+        The WebP file, or 304 if the client's copy is current
+    """
+    if width not in VARIANT_WIDTHS or not image_blob_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}-{width}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await image_variants.aensure_variant(digest, width)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering image variant: {str(e)}")
+
+    return FileResponse(path, media_type="image/webp", headers=headers)
@@ -4,6 +4,8 @@ from ..services.pokeapi import pokeapi_service
 
 router = APIRouter()
 
+MAX_BATCH_IDS = 100
+
 
 @router.get("/search")
 async def search_pokemon(query: str, limit: int = 20):
@@ -20,10 +22,49 @@ async def search_pokemon(query: str, limit: int = 20):
     if not query or len(query) < 2:
         raise HTTPException(status_code=400, detail="Query must be at least 2 characters")
     
-    results = pokeapi_service.search_pokemon(query, limit)
+    results = await pokeapi_service.asearch_pokemon(query, limit)
     return {"results": results, "count": len(results)}
 
 
+@router.get("/batch")
+async def get_pokemon_batch(ids: str):
+    """
+    Get Pokemon information for several IDs in one request.
+
+    Args:
+        ids: Comma-separated Pokemon IDs (max 100)
+
+    Returns:
+        Found Pokemon (in request order) and the IDs that were not found
+    """
+    try:
+        pokemon_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+
+    if not pokemon_ids or any(pokemon_id < 1 for pokemon_id in pokemon_ids):
+        raise HTTPException(status_code=400, detail="Invalid Pokemon ID")
+    if len(pokemon_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} IDs per request")
+
+    found = await pokeapi_service.aextract_attributes_batch(pokemon_ids)
+
+    results = [found[pokemon_id] for pokemon_id in pokemon_ids if pokemon_id in found]
+    not_found = [pokemon_id for pokemon_id in pokemon_ids if pokemon_id not in found]
+    return {"results": results, "count": len(results), "not_found": not_found}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss/eviction counters for the in-process Pokemon cache.
+
+    Returns:
+        Cache statistics
+    """
+    return pokeapi_service.get_cache_stats()
+
+
 @router.get("/{pokemon_id}")
 async def get_pokemon(pokemon_id: int):
     """
@@ -38,7 +79,7 @@ async def get_pokemon(pokemon_id: int):
     if pokemon_id < 1:
         raise HTTPException(status_code=400, detail="Invalid Pokemon ID")
     
-    pokemon_data = pokeapi_service.extract_attributes(pokemon_id)
+    pokemon_data = await pokeapi_service.aextract_attributes(pokemon_id)
     
     if not pokemon_data:
         raise HTTPException(status_code=404, detail=f"Pokemon with ID {pokemon_id} not found")
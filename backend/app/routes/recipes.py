@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, Tuple
+from pydantic import BaseModel, Field
+from datetime import datetime
+import base64
 import json
+import uuid
+from ..config import settings
 from ..database import get_db
 from ..models import Recipe
-from ..workflows import generate_recipe_workflow
+from ..services.image_variants import image_variants
+from ..services.image_jobs import image_job_queue, ImageQueueFullError
+from ..services.pokemon_index import MAX_POKEMON_ID
+from ..services.budget_guard import budget_guard, BudgetExceededError
+from ..workflows import generate_recipe_workflow, stream_recipe_workflow, RunMismatchError
 
 
 def sanitize_dict(data: Any) -> Any:
@@ -37,6 +47,8 @@ class RecipeGenerateRequest(BaseModel):
     pokemon_id: int
     preferences: Optional[Dict[str, Any]] = None
     generate_image: bool = False
+    # Resume the checkpointed run with this ID (returned when a run fails)
+    run_id: Optional[str] = Field(None, max_length=64, pattern=r"^[A-Za-z0-9_-]+$")
 
 
 class RecipeResponse(BaseModel):
@@ -51,8 +63,70 @@ class RecipeResponse(BaseModel):
     difficulty: Optional[str] = None
     prep_time: Optional[int] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[int, str]] = None
     thematic_connection: Optional[str] = None
     presentation: Optional[str] = None
+    run_id: Optional[str] = None
+
+
+def _validate_generate_request(request: RecipeGenerateRequest) -> Dict[str, Any]:
+    """Validate a generation request and return its sanitized preferences."""
+    if not (1 <= request.pokemon_id <= MAX_POKEMON_ID):
+        raise HTTPException(status_code=400, detail=f"Pokemon ID must be between 1 and {MAX_POKEMON_ID}")
+
+    # Sanitize preferences to remove any None values
+    return sanitize_dict(request.preferences) if request.preferences else {}
+
+
+def _generation_estimate(request: RecipeGenerateRequest) -> float:
+    """Estimated OpenAI cost of a generation request, reserved against the budget."""
+    estimate = settings.budget_recipe_estimate_usd
+    if request.generate_image:
+        estimate += settings.budget_image_estimate_usd
+    return estimate
+
+
+def _reserve_budget(estimate: float):
+    """Reserve estimated cost, rejecting the request with 429 when over budget."""
+    try:
+        budget_guard.reserve(estimate)
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+def _build_recipe_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the API response from a final workflow state."""
+    validated_recipe = result.get("validated_recipe") or {}
+    pokemon_data = result.get("pokemon_data") or {}
+    
+    return {
+        "id": result.get("recipe_id"),
+        "pokemon_id": pokemon_data.get("id"),
+        "pokemon_name": pokemon_data.get("name"),
+        "recipe_title": validated_recipe.get("title"),
+        "description": validated_recipe.get("description"),
+        "ingredients": validated_recipe.get("ingredients", []),
+        "instructions": validated_recipe.get("instructions", []),
+        "difficulty": validated_recipe.get("difficulty"),
+        "prep_time": validated_recipe.get("prep_time"),
+        "image_url": result.get("image_url"),
+        "image_variants": image_variants.variants_for(result.get("image_url")),
+        "image_job_id": result.get("image_job_id"),
+        "thematic_connection": validated_recipe.get("thematic_connection"),
+        "presentation": validated_recipe.get("presentation"),
+        "pokemon_sprite": pokemon_data.get("sprite"),
+        "run_id": result.get("run_id")
+    }
+
+
+def _run_failed_detail(run_id: str, error: Exception) -> Dict[str, Any]:
+    """Error detail for a run that raised; it can be resumed by sending run_id again."""
+    return {"message": "Recipe generation failed", "errors": [str(error)], "run_id": run_id}
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @router.post("/generate")
@@ -60,24 +134,36 @@ async def generate_recipe(request: RecipeGenerateRequest):
     """
     Generate a new recipe based on a Pokemon.
 
+    Every run is checkpointed under a run ID. If a step fails (e.g. image
+    generation or saving), the 500 response includes run_id; sending the
+    same request with that run_id resumes the run after its last completed
+    step instead of generating the recipe again.
+
     Args:
         request: Recipe generation request
 
     Returns:
         Generated recipe with optional image
     """
-    if not (1 <= request.pokemon_id <= 1017):
-        raise HTTPException(status_code=400, detail="Pokemon ID must be between 1 and 1017")
-
-    # Sanitize preferences to remove any None values
-    sanitized_preferences = sanitize_dict(request.preferences) if request.preferences else {}
+    sanitized_preferences = _validate_generate_request(request)
+    run_id = request.run_id or uuid.uuid4().hex
+    estimate = _generation_estimate(request)
+    _reserve_budget(estimate)
 
     # Execute the LangGraph workflow
-    result = await generate_recipe_workflow(
-        pokemon_id=request.pokemon_id,
-        preferences=sanitized_preferences,
-        generate_image=request.generate_image
-    )
+    try:
+        result = await generate_recipe_workflow(
+            pokemon_id=request.pokemon_id,
+            preferences=sanitized_preferences,
+            generate_image=request.generate_image,
+            run_id=run_id
+        )
+    except RunMismatchError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=_run_failed_detail(run_id, e))
+    finally:
+        budget_guard.release(estimate)
     
     # Check for errors
     if result.get("errors"):
@@ -86,74 +172,185 @@ async def generate_recipe(request: RecipeGenerateRequest):
             detail={"message": "Recipe generation failed", "errors": result["errors"]}
         )
     
-    # Extract recipe data
-    validated_recipe = result.get("validated_recipe", {})
-    pokemon_data = result.get("pokemon_data", {})
-    
-    response = {
-        "id": result.get("recipe_id"),
-        "pokemon_id": pokemon_data.get("id"),
-        "pokemon_name": pokemon_data.get("name"),
-        "recipe_title": validated_recipe.get("title"),
-        "description": validated_recipe.get("description"),
-        "ingredients": validated_recipe.get("ingredients", []),
-        "instructions": validated_recipe.get("instructions", []),
-        "difficulty": validated_recipe.get("difficulty"),
-        "prep_time": validated_recipe.get("prep_time"),
-        "image_url": result.get("image_url"),
-        "thematic_connection": validated_recipe.get("thematic_connection"),
-        "presentation": validated_recipe.get("presentation"),
-        "pokemon_sprite": pokemon_data.get("sprite")
-    }
-    
-    return response
+    return _build_recipe_response(result)
+
+
+@router.post("/generate/stream")
+async def generate_recipe_stream(request: RecipeGenerateRequest):
+    """
+    Generate a new recipe, streaming progress as Server-Sent Events.
+
+    Events:
+        stage: a workflow node finished ({"stage": name})
+        recipe_partial: incrementally parsed recipe fields while the LLM streams
+        complete: the final recipe (same shape as POST /generate)
+        error: generation failed ({"message", "errors"}, plus "run_id" when
+            the run can be resumed by sending it back)
+
+    Args:
+        request: Recipe generation request
+
+    Returns:
+        text/event-stream response
+    """
+    sanitized_preferences = _validate_generate_request(request)
+    run_id = request.run_id or uuid.uuid4().hex
+    estimate = _generation_estimate(request)
+    _reserve_budget(estimate)
+
+    async def event_stream():
+        try:
+            async for event, data in stream_recipe_workflow(
+                pokemon_id=request.pokemon_id,
+                preferences=sanitized_preferences,
+                generate_image=request.generate_image,
+                run_id=run_id
+            ):
+                if event != "final":
+                    yield _sse_event(event, data)
+                elif data.get("errors"):
+                    yield _sse_event("error", {"message": "Recipe generation failed", "errors": data["errors"]})
+                else:
+                    yield _sse_event("complete", _build_recipe_response(data))
+        except RunMismatchError as e:
+            yield _sse_event("error", {"message": "Recipe generation failed", "errors": [str(e)]})
+        except Exception as e:
+            yield _sse_event("error", _run_failed_detail(run_id, e))
+        finally:
+            # Runs on completion and when the client disconnects mid-stream
+            # (the generator is closed); background tasks are skipped then
+            budget_guard.release(estimate)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Columns returned by the summary list view
+SUMMARY_COLUMNS = (
+    Recipe.id,
+    Recipe.pokemon_id,
+    Recipe.pokemon_name,
+    Recipe.recipe_title,
+    Recipe.description,
+    Recipe.difficulty,
+    Recipe.prep_time,
+    Recipe.image_url,
+    Recipe.created_at
+)
+
+
+def _encode_cursor(created_at: datetime, recipe_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor."""
+    raw = f"{created_at.isoformat()}|{recipe_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from _encode_cursor, raising 400 if it is malformed."""
+    try:
+        created_at, recipe_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/")
 async def list_recipes(
     skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(default=20, ge=1),
     pokemon_id: Optional[int] = None,
+    view: str = Query(default="full", pattern="^(full|summary)$"),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    List saved recipes.
+    List saved recipes, newest first.
+
+    Pages are addressed by keyset: pass the previous page's next_cursor as
+    cursor to continue after its last recipe, at constant cost per page.
+    skip (OFFSET) is still accepted when no cursor is given.
     
     Args:
         skip: Number of recipes to skip (default: 0)
         limit: Maximum number of recipes to return (default: 20)
         pokemon_id: Filter by Pokemon ID (optional)
+        view: "full" for complete recipes, "summary" for card fields only
+        cursor: Position returned as next_cursor by the previous page
         db: Database session
         
     Returns:
-        List of recipes
+        List of recipes and the cursor of the next page (None on the last page)
     """
-    query = db.query(Recipe)
+    summary = view == "summary"
+    query = db.query(*SUMMARY_COLUMNS) if summary else db.query(Recipe)
     
     if pokemon_id:
         query = query.filter(Recipe.pokemon_id == pokemon_id)
+
+    query = query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+    if cursor:
+        query = query.filter(tuple_(Recipe.created_at, Recipe.id) < _decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
     
-    recipes = query.order_by(Recipe.created_at.desc()).offset(skip).limit(limit).all()
+    recipes = query.limit(limit).all()
     
     result = []
     for recipe in recipes:
-        result.append({
+        item = {
             "id": recipe.id,
             "pokemon_id": recipe.pokemon_id,
             "pokemon_name": recipe.pokemon_name,
             "recipe_title": recipe.recipe_title,
             "description": recipe.description,
-            "ingredients": json.loads(recipe.ingredients) if recipe.ingredients else [],
-            "instructions": json.loads(recipe.instructions) if recipe.instructions else [],
             "difficulty": recipe.difficulty,
             "prep_time": recipe.prep_time,
-            "thematic_connection": recipe.thematic_connection,
-            "presentation": recipe.presentation,
             "image_url": recipe.image_url,
+            "image_variants": image_variants.variants_for(recipe.image_url),
             "created_at": recipe.created_at.isoformat() if recipe.created_at else None
-        })
+        }
+        if not summary:
+            item.update({
+                "ingredients": json.loads(recipe.ingredients) if recipe.ingredients else [],
+                "instructions": json.loads(recipe.instructions) if recipe.instructions else [],
+                "thematic_connection": recipe.thematic_connection,
+                "presentation": recipe.presentation
+            })
+        result.append(item)
+
+    next_cursor = None
+    if len(recipes) == limit and recipes[-1].created_at:
+        next_cursor = _encode_cursor(recipes[-1].created_at, recipes[-1].id)
     
-    return {"recipes": result, "count": len(result)}
+    return {"recipes": result, "count": len(result), "next_cursor": next_cursor}
+
+
+@router.get("/image-jobs/{job_id}")
+async def get_image_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the status of an image generation job.
+
+    Args:
+        job_id: Image job ID
+        db: Database session
+
+    Returns:
+        The job; once done, also the recipe's image URL and variants
+    """
+    job = image_job_queue.get(db, job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Image job with ID {job_id} not found")
+
+    result = job.to_dict()
+    if job.status == "done":
+        image_url = db.query(Recipe.image_url).filter(Recipe.id == job.recipe_id).scalar()
+        result["image_url"] = image_url
+        result["image_variants"] = image_variants.variants_for(image_url)
+    return result
 
 
 @router.get("/{recipe_id}")
@@ -186,85 +383,40 @@ async def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
         "thematic_connection": recipe.thematic_connection,
         "presentation": recipe.presentation,
         "image_url": recipe.image_url,
+        "image_variants": image_variants.variants_for(recipe.image_url),
         "created_at": recipe.created_at.isoformat() if recipe.created_at else None
     }
 
 
-@router.post("/{recipe_id}/generate-image")
+@router.post("/{recipe_id}/generate-image", status_code=202)
 async def generate_recipe_image(recipe_id: int, db: Session = Depends(get_db)):
     """
-    Generate an image for an existing recipe.
+    Queue image generation for an existing recipe.
+
+    The image is generated by a background worker; poll
+    GET /recipes/image-jobs/{job_id} until the job is done, then re-fetch
+    the recipe. A recipe that already has a queued job gets that job back.
 
     Args:
         recipe_id: Recipe ID
         db: Database session
 
     Returns:
-        Updated recipe with image URL
+        The image job
     """
-    from ..services.image_service import image_service
-    from ..services.llm_service import llm_service
-    from ..services.pokeapi import pokeapi_service
-
-    # Fetch recipe
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
 
     if not recipe:
         raise HTTPException(status_code=404, detail=f"Recipe with ID {recipe_id} not found")
 
     try:
-        # Fetch Pokemon data
-        pokemon_data = pokeapi_service.extract_attributes(recipe.pokemon_id)
-        if not pokemon_data:
-            raise HTTPException(status_code=404, detail=f"Pokemon with ID {recipe.pokemon_id} not found")
-
-        # Build recipe data for prompt generation
-        recipe_data = {
-            "title": recipe.recipe_title,
-            "description": recipe.description,
-            "ingredients": json.loads(recipe.ingredients) if recipe.ingredients else [],
-            "instructions": json.loads(recipe.instructions) if recipe.instructions else []
-        }
-
-        # Generate image prompt
-        image_prompt = llm_service.generate_image_prompt(recipe_data, pokemon_data)
-
-        # Generate image
-        image_b64 = image_service.generate_image(
-            image_prompt,
-            recipe_id=recipe_id,
-            pokemon_id=recipe.pokemon_id
-        )
+        # Reject up front if the budget cannot cover an image; the worker reserves it when it runs
+        budget_guard.check(settings.budget_image_estimate_usd)
+        job = image_job_queue.submit(db, recipe_id)
+    except (BudgetExceededError, ImageQueueFullError) as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
-        if not image_b64:
-            raise HTTPException(status_code=500, detail="Failed to generate image")
-
-        # Update recipe with new image
-        image_url = f"data:image/png;base64,{image_b64}"
-        recipe.image_url = image_url
-        db.commit()
-
-        # Return updated recipe data
-        return {
-            "id": recipe.id,
-            "pokemon_id": recipe.pokemon_id,
-            "pokemon_name": recipe.pokemon_name,
-            "recipe_title": recipe.recipe_title,
-            "description": recipe.description,
-            "ingredients": json.loads(recipe.ingredients) if recipe.ingredients else [],
-            "instructions": json.loads(recipe.instructions) if recipe.instructions else [],
-            "difficulty": recipe.difficulty,
-            "prep_time": recipe.prep_time,
-            "image_url": recipe.image_url,
-            "thematic_connection": None,
-            "presentation": None,
-            "pokemon_sprite": pokemon_data.get("sprite")
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating image: {str(e)}")
+    return job.to_dict()
 
 
 @router.delete("/{recipe_id}")
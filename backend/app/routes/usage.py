@@ -1,34 +1,99 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional
 from datetime import datetime, timedelta
 from ..database import get_db
-from ..models import OpenAIUsage
+from ..models import OpenAIUsage, UsageRollup
+from ..services.budget_guard import budget_guard
+from ..services.recipe_cache import recipe_cache
+from ..services.recipe_repair import recipe_repair_service
 
 router = APIRouter()
 
 
 @router.get("/summary")
 async def get_usage_summary(db: Session = Depends(get_db)):
-    """Get overall usage statistics."""
+    """Get overall usage statistics (read from the all-time rollups)."""
+
+    rollups = db.query(UsageRollup).filter(UsageRollup.period == "all").all()
+
+    by_request_type = {}
+    for rollup in rollups:
+        totals = by_request_type.setdefault(rollup.request_type, {
+            "requests": 0, "total_tokens": 0, "cost_usd": 0.0, "latency_ms_total": 0, "latency_count": 0
+        })
+        totals["requests"] += rollup.requests
+        totals["total_tokens"] += rollup.total_tokens
+        totals["cost_usd"] += rollup.cost_usd
+        totals["latency_ms_total"] += rollup.latency_ms_total
+        totals["latency_count"] += rollup.latency_count
+
+    for totals in by_request_type.values():
+        latency_ms_total = totals.pop("latency_ms_total")
+        latency_count = totals.pop("latency_count")
+        totals["cost_usd"] = round(totals["cost_usd"], 4)
+        totals["avg_latency_ms"] = round(latency_ms_total / latency_count) if latency_count else None
 
-    total_cost = db.query(func.sum(OpenAIUsage.cost_usd)).scalar() or 0.0
-    total_tokens = db.query(func.sum(OpenAIUsage.total_tokens)).scalar() or 0
+    return {
+        "total_cost_usd": round(sum(r.cost_usd for r in rollups), 4),
+        "total_tokens": sum(r.total_tokens for r in rollups),
+        "recipes_generated": by_request_type.get("recipe_generation", {}).get("requests", 0),
+        "images_generated": by_request_type.get("image_generation", {}).get("requests", 0),
+        "by_request_type": by_request_type
+    }
 
-    recipe_count = db.query(func.count(OpenAIUsage.id)).filter(
-        OpenAIUsage.request_type == "recipe_generation"
-    ).scalar() or 0
 
-    image_count = db.query(func.count(OpenAIUsage.id)).filter(
-        OpenAIUsage.request_type == "image_generation"
-    ).scalar() or 0
+@router.get("/timeseries")
+async def get_usage_timeseries(
+    period: str = Query(default="day", pattern="^(hour|day)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    model: Optional[str] = None,
+    request_type: Optional[str] = None,
+    limit: int = Query(default=30, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get usage per hour or day bucket, most recent first."""
+
+    bucket = UsageRollup.bucket_start
+    query = db.query(
+        bucket,
+        func.sum(UsageRollup.requests),
+        func.sum(UsageRollup.total_tokens),
+        func.sum(UsageRollup.cost_usd),
+        func.sum(UsageRollup.latency_ms_total),
+        func.sum(UsageRollup.latency_count)
+    ).filter(UsageRollup.period == period)
+
+    try:
+        if start_date:
+            query = query.filter(bucket >= datetime.fromisoformat(start_date))
+        if end_date:
+            query = query.filter(bucket <= datetime.fromisoformat(end_date))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in ISO 8601 format")
+
+    if model:
+        query = query.filter(UsageRollup.model == model)
+    if request_type:
+        query = query.filter(UsageRollup.request_type == request_type)
+
+    rows = query.group_by(bucket).order_by(bucket.desc()).limit(limit).all()
 
     return {
-        "total_cost_usd": round(total_cost, 4),
-        "total_tokens": total_tokens,
-        "recipes_generated": recipe_count,
-        "images_generated": image_count
+        "period": period,
+        "buckets": [
+            {
+                "bucket_start": start.isoformat(),
+                "requests": requests,
+                "total_tokens": total_tokens,
+                "cost_usd": round(cost_usd, 4),
+                "avg_latency_ms": round(latency_ms_total / latency_count) if latency_count else None
+            }
+            for start, requests, total_tokens, cost_usd, latency_ms_total, latency_count in rows
+        ],
+        "count": len(rows)
     }
 
 
@@ -66,14 +131,13 @@ async def get_usage_history(
 
 
 @router.get("/quota")
-async def get_quota_status(db: Session = Depends(get_db)):
+async def get_quota_status():
     """Get current usage vs budget limits."""
 
-    from ..config import settings
-
-    budget_limit = float(getattr(settings, 'openai_budget_limit', 50.0))
-
-    current_cost = db.query(func.sum(OpenAIUsage.cost_usd)).scalar() or 0.0
+    # Served from the admission guard's running total (seeded from the rollups)
+    status = budget_guard.status()
+    budget_limit = status["budget_limit_usd"]
+    current_cost = status["spent_usd"]
 
     percentage_used = (current_cost / budget_limit * 100) if budget_limit > 0 else 0
 
@@ -81,5 +145,22 @@ async def get_quota_status(db: Session = Depends(get_db)):
         "current_cost_usd": round(current_cost, 4),
         "budget_limit_usd": budget_limit,
         "percentage_used": round(percentage_used, 2),
-        "remaining_usd": round(budget_limit - current_cost, 4)
+        "remaining_usd": round(budget_limit - current_cost, 4),
+        "reserved_usd": round(status["reserved_usd"], 4),
+        "requests_admitted": status["admitted"],
+        "requests_rejected": status["rejected"]
     }
+
+
+@router.get("/recipe-cache")
+async def get_recipe_cache_stats():
+    """Get hit-rate statistics for the LLM recipe response cache."""
+
+    return recipe_cache.stats()
+
+
+@router.get("/recipe-repairs")
+async def get_recipe_repair_stats():
+    """Get counters for local recipe repairs and the LLM refines they avoided."""
+
+    return recipe_repair_service.stats()
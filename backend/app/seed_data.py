@@ -7,6 +7,7 @@ import os
 from sqlalchemy.orm import Session
 from .models import Recipe
 from .database import SessionLocal
+from .services.blob_store import image_blob_store
 from .utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -94,7 +95,8 @@ def seed_database(db: Session = None):
                 prep_time=recipe_data.get("prep_time"),
                 thematic_connection=recipe_data.get("thematic_connection"),
                 presentation=recipe_data.get("presentation"),
-                image_url=recipe_data.get("image_url")  # Already includes base64 data
+                # Seed files embed base64 data URLs; store them as blobs
+                image_url=image_blob_store.externalize(recipe_data.get("image_url"))
             )
             
             db.add(recipe)
@@ -114,6 +116,23 @@ def seed_database(db: Session = None):
             db.close()
 
 
+def externalize_recipe_images(db: Session):
+    """
+    Move images still stored inline as data: URLs into the blob store.
+
+    Runs at startup so databases created before the blob store shrink to
+    short image URLs.
+    """
+    recipes = db.query(Recipe).filter(Recipe.image_url.like("data:%")).all()
+    if not recipes:
+        return
+
+    for recipe in recipes:
+        recipe.image_url = image_blob_store.externalize(recipe.image_url)
+    db.commit()
+    logger.info(f"🖼️  Moved {len(recipes)} inline recipe images to the blob store")
+
+
 if __name__ == "__main__":
     # Allow running this script directly for testing
     seed_database()
@@ -0,0 +1,94 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+from typing import Optional
+from ..config import settings
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+IMAGE_URL_PREFIX = "/api/images/"
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Magic-byte prefixes of the image formats we store
+MEDIA_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+class ImageBlobStore:
+    """
+    Content-addressed file store for generated images.
+
+    Each image is written once, named by the SHA-256 of its bytes and fanned
+    out by the first two hex digits (root/ab/abcdef...). Blobs are immutable,
+    so the digest doubles as a strong ETag.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def is_digest(value: str) -> bool:
+        return bool(DIGEST_PATTERN.match(value))
+
+    def path_for(self, digest: str) -> str:
+        """Filesystem path of a blob (which may not exist)."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return self.is_digest(digest) and os.path.exists(self.path_for(digest))
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their digest; storing existing content is a no-op."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def put_base64(self, image_b64: str) -> str:
+        """Store base64-encoded image data and return the digest."""
+        return self.put(base64.b64decode(image_b64))
+
+    def media_type(self, digest: str) -> str:
+        """Detect a blob's media type from its first bytes."""
+        with open(self.path_for(digest), "rb") as f:
+            head = f.read(12)
+        for magic, media_type in MEDIA_TYPES:
+            if head.startswith(magic):
+                return media_type
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image/webp"
+        return "application/octet-stream"
+
+    @staticmethod
+    def url_for(digest: str) -> str:
+        """Short URL under which the image is served."""
+        return f"{IMAGE_URL_PREFIX}{digest}"
+
+    def externalize(self, image_url: Optional[str]) -> Optional[str]:
+        """
+        Move a data: URL into the store and return its short URL.
+
+        Any other value (None, an already short URL, a remote URL) is returned as is.
+        """
+        if not image_url or not image_url.startswith("data:"):
+            return image_url
+        try:
+            _, image_b64 = image_url.split(",", 1)
+            return self.url_for(self.put_base64(image_b64))
+        except (ValueError, binascii.Error) as e:
+            logger.warning(f"Could not externalize data URL: {e}")
+            return image_url
+
+
+image_blob_store = ImageBlobStore(settings.image_store_path)
@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Dict, Optional
+from ..config import settings
+
+
+class BudgetExceededError(Exception):
+    """Raised when admitting a request would exceed the OpenAI budget."""
+
+
+class BudgetGuard:
+    """
+    Admission control against openai_budget_limit.
+
+    Keeps an in-memory running total of recorded spend, seeded once from the
+    usage table and incremented by UsageTracker, plus the estimated cost
+    reserved by requests still in flight. A request is admitted only if
+    spent + reserved + its estimate stays within the limit. The total is per
+    process; other processes' spend is picked up on the next restart.
+    """
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._spent: Optional[float] = None
+        self._reserved = 0.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _ensure_seeded(self):
+        """Load the recorded spend from the database on first use (lock held)."""
+        if self._spent is None:
+            # Imported here: usage_tracker reports spend back to this module
+            from .usage_tracker import usage_tracker
+            self._spent = usage_tracker.get_total_cost()
+
+    def spent(self) -> float:
+        """Return the total recorded spend in USD."""
+        with self._lock:
+            self._ensure_seeded()
+            return self._spent
+
+    def record(self, cost: float):
+        """Add recorded spend to the running total."""
+        with self._lock:
+            # Before seeding, the seed query will include this cost already
+            if self._spent is not None:
+                self._spent += cost
+
+    def _admit(self, estimate: float):
+        """Raise BudgetExceededError unless estimate fits in the remaining budget (lock held)."""
+        self._ensure_seeded()
+        projected = self._spent + self._reserved + estimate
+        if projected > self.limit:
+            self.rejected += 1
+            raise BudgetExceededError(
+                f"OpenAI budget exhausted: ${self._spent:.2f} spent and "
+                f"${self._reserved:.2f} reserved of ${self.limit:.2f}"
+            )
+
+    def check(self, estimate: float):
+        """Raise BudgetExceededError if a request of this estimate would be rejected now."""
+        with self._lock:
+            self._admit(estimate)
+
+    def reserve(self, estimate: float):
+        """Reserve estimated cost for a request, or raise BudgetExceededError."""
+        with self._lock:
+            self._admit(estimate)
+            self._reserved += estimate
+            self.admitted += 1
+
+    def release(self, estimate: float):
+        """Release a reservation once its request has finished."""
+        with self._lock:
+            self._reserved = max(0.0, self._reserved - estimate)
+
+    def status(self) -> Dict[str, Any]:
+        """Return the running total, reservations and admission counters."""
+        with self._lock:
+            self._ensure_seeded()
+            return {
+                "spent_usd": self._spent,
+                "reserved_usd": self._reserved,
+                "budget_limit_usd": self.limit,
+                "admitted": self.admitted,
+                "rejected": self.rejected
+            }
+
+
+budget_guard = BudgetGuard(limit=settings.openai_budget_limit)
@@ -0,0 +1,227 @@
+import asyncio
+import json
+from typing import List, Optional, Set
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models import ImageJob, Recipe
+from .blob_store import image_blob_store
+from .budget_guard import budget_guard, BudgetExceededError
+from .image_service import image_service
+from .image_variants import image_variants
+from .llm_service import llm_service
+from .pokeapi import pokeapi_service
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class ImageQueueFullError(Exception):
+    """Raised when too many image jobs are already waiting."""
+
+
+class ImageJobQueue:
+    """
+    Background image generation with bounded concurrency.
+
+    Jobs are rows in image_jobs; only their IDs travel through the in-memory
+    queue, so pending work is picked up again by start() after a restart.
+    A fixed number of workers bounds concurrent gpt-image-1 calls. Failed
+    attempts are retried with exponential backoff, the last one at low
+    quality.
+    """
+
+    def __init__(self, workers: int, max_pending: int, max_attempts: int, backoff_seconds: float):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Start the workers and re-queue jobs left pending or running by a previous process."""
+        self._queue = asyncio.Queue()
+        db = SessionLocal()
+        try:
+            db.query(ImageJob).filter(ImageJob.status == "running").update(
+                {ImageJob.status: "pending"}, synchronize_session=False
+            )
+            db.commit()
+            job_ids = [row.id for row in db.query(ImageJob.id).filter(ImageJob.status == "pending").order_by(ImageJob.id)]
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+        if job_ids:
+            logger.info(f"Resuming {len(job_ids)} image jobs")
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"image-job-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel the workers; interrupted jobs resume on the next start()."""
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+        self._queue = None
+
+    def submit(self, db: Session, recipe_id: int) -> ImageJob:
+        """
+        Queue image generation for a recipe.
+
+        Returns the recipe's active job if it already has one.
+
+        Raises:
+            ImageQueueFullError: If max_pending jobs are already waiting
+        """
+        if self._queue is None:
+            raise RuntimeError("Image job queue is not running")
+
+        job = (
+            db.query(ImageJob)
+            .filter(ImageJob.recipe_id == recipe_id, ImageJob.status.in_(ACTIVE_STATUSES))
+            .first()
+        )
+        if job:
+            return job
+
+        active = db.query(ImageJob).filter(ImageJob.status.in_(ACTIVE_STATUSES)).count()
+        if active >= self.max_pending:
+            raise ImageQueueFullError(f"{active} image jobs are already queued")
+
+        job = ImageJob(recipe_id=recipe_id, status="pending")
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    @staticmethod
+    def get(db: Session, job_id: int) -> Optional[ImageJob]:
+        """Look up a job by ID."""
+        return db.get(ImageJob, job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Error running image job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _retry_later(self, job_id: int, delay: float):
+        async def requeue():
+            await asyncio.sleep(delay)
+            if self._queue is not None:
+                self._queue.put_nowait(job_id)
+
+        task = asyncio.create_task(requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _run(self, job_id: int):
+        """Make one attempt at a job."""
+        db = SessionLocal()
+        try:
+            job = db.get(ImageJob, job_id)
+            if not job or job.status != "pending":
+                return
+
+            recipe = db.get(Recipe, job.recipe_id)
+            if not recipe:
+                job.status = "failed"
+                job.last_error = f"Recipe with ID {job.recipe_id} not found"
+                db.commit()
+                return
+
+            job.status = "running"
+            job.attempts += 1
+            db.commit()
+
+            # Last attempt at low quality: cheaper and less likely to fail
+            quality = "low" if self.max_attempts > 1 and job.attempts >= self.max_attempts else "medium"
+
+            estimate = settings.budget_image_estimate_usd
+            try:
+                budget_guard.reserve(estimate)
+            except BudgetExceededError as e:
+                job.status = "failed"
+                job.last_error = str(e)
+                db.commit()
+                return
+
+            try:
+                image_b64 = await self._generate(recipe, quality)
+                error = None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            finally:
+                budget_guard.release(estimate)
+
+            if error is None:
+                # Store the image in the blob store and keep only its short URL
+                digest = image_blob_store.put_base64(image_b64)
+                image_variants.submit(digest)
+                recipe.image_url = image_blob_store.url_for(digest)
+                job.status = "done"
+                job.quality = quality
+                job.last_error = None
+                db.commit()
+                logger.info(f"Image job {job.id} done for recipe {recipe.id} ({quality} quality)")
+                return
+
+            logger.warning(f"Image job {job.id} attempt {job.attempts}/{self.max_attempts} failed: {error}")
+            job.last_error = error
+            if job.attempts >= self.max_attempts:
+                job.status = "failed"
+                db.commit()
+                return
+
+            job.status = "pending"
+            db.commit()
+            self._retry_later(job.id, self.backoff_seconds * 2 ** (job.attempts - 1))
+        finally:
+            db.close()
+
+    @staticmethod
+    async def _generate(recipe: Recipe, quality: str) -> str:
+        """Generate base64 image data for a recipe."""
+        pokemon_data = await pokeapi_service.aextract_attributes(recipe.pokemon_id)
+        if not pokemon_data:
+            raise ValueError(f"Pokemon with ID {recipe.pokemon_id} not found")
+
+        recipe_data = {
+            "title": recipe.recipe_title,
+            "description": recipe.description,
+            "ingredients": json.loads(recipe.ingredients) if recipe.ingredients else [],
+            "instructions": json.loads(recipe.instructions) if recipe.instructions else []
+        }
+        image_prompt = llm_service.generate_image_prompt(recipe_data, pokemon_data)
+
+        # The OpenAI client is synchronous; keep it off the event loop
+        return await asyncio.to_thread(
+            image_service.generate_image_with_quality,
+            image_prompt,
+            quality,
+            recipe_id=recipe.id,
+            pokemon_id=recipe.pokemon_id
+        )
+
+
+image_job_queue = ImageJobQueue(
+    workers=settings.image_job_workers,
+    max_pending=settings.image_job_max_pending,
+    max_attempts=settings.image_job_max_attempts,
+    backoff_seconds=settings.image_job_backoff_seconds
+)
@@ -1,3 +1,6 @@
+import base64
+import time
+import requests as req
 from openai import OpenAI
 from typing import Optional
 from ..config import settings
@@ -13,6 +16,60 @@ class ImageService:
     def __init__(self):
         self.client = OpenAI(api_key=settings.openai_api_key)
 
+    def _request_image(self, prompt: str, quality: str, size: str) -> str:
+        """Make a single gpt-image-1 request and return base64 image data, raising on failure."""
+        response = self.client.images.generate(
+            model="gpt-image-1",
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            n=1
+        )
+
+        if not response.data:
+            raise ValueError("gpt-image-1 returned no image")
+
+        # gpt-image-1 returns base64 encoded images by default
+        if getattr(response.data[0], 'b64_json', None):
+            return response.data[0].b64_json
+        if getattr(response.data[0], 'url', None):
+            # If we get a URL, we need to download and convert to base64
+            img_response = req.get(response.data[0].url)
+            return base64.b64encode(img_response.content).decode('utf-8')
+        raise ValueError("gpt-image-1 response has neither b64_json nor url")
+
+    def generate_image_with_quality(
+        self,
+        prompt: str,
+        quality: str,
+        size: str = "1024x1024",
+        recipe_id: Optional[int] = None,
+        pokemon_id: Optional[int] = None
+    ) -> str:
+        """
+        Make a single gpt-image-1 request at the given quality.
+
+        Args:
+            prompt: Image generation prompt
+            quality: gpt-image-1 quality (low, medium, high)
+            size: Image size (1024x1024, 1024x1792, 1792x1024)
+
+        Returns:
+            Base64-encoded image data
+
+        Raises:
+            Exception: If the request fails or returns no image
+        """
+        started = time.perf_counter()
+        image_b64 = self._request_image(prompt, quality, size)
+        usage_tracker.track_image_usage(
+            quality=quality,
+            recipe_id=recipe_id,
+            pokemon_id=pokemon_id,
+            latency_ms=int((time.perf_counter() - started) * 1000)
+        )
+        return image_b64
+
     def generate_image(
         self,
         prompt: str,
@@ -23,6 +80,8 @@ class ImageService:
         """
         Generate an image using gpt-image-1 (state-of-the-art image generation model).
 
+        Tries medium quality first and falls back to low quality on failure.
+
         Args:
             prompt: Image generation prompt (detailed and specific)
             size: Image size (1024x1024, 1024x1792, 1792x1024)
@@ -30,63 +89,12 @@ class ImageService:
         Returns:
             Base64-encoded image data or None if generation fails
         """
-        try:
-            # Use gpt-image-1 for high-quality image generation
-            response = self.client.images.generate(
-                model="gpt-image-1",
-                prompt=prompt,
-                size=size,
-                quality="medium",
-                n=1
-            )
-
-            # gpt-image-1 returns base64 encoded images by default
-            if response.data and len(response.data) > 0:
-                usage_tracker.track_image_usage(
-                    quality="medium",
-                    recipe_id=recipe_id,
-                    pokemon_id=pokemon_id
-                )
-                # Check if we have b64_json or need to get from url
-                if hasattr(response.data[0], 'b64_json') and response.data[0].b64_json:
-                    return response.data[0].b64_json
-                elif hasattr(response.data[0], 'url') and response.data[0].url:
-                    # If we get a URL, we need to download and convert to base64
-                    import base64
-                    import requests as req
-                    img_response = req.get(response.data[0].url)
-                    return base64.b64encode(img_response.content).decode('utf-8')
-            return None
-
-        except Exception as e:
-            logger.error(f"Error generating image with gpt-image-1 (medium quality): {e}")
+        for quality in ("medium", "low"):
             try:
-                # Fallback to gpt-image-1 with standard quality
-                response = self.client.images.generate(
-                    model="gpt-image-1",
-                    prompt=prompt,
-                    size=size,
-                    quality="low",
-                    n=1
-                )
-                if response.data and len(response.data) > 0:
-                    usage_tracker.track_image_usage(
-                        quality="low",
-                        recipe_id=recipe_id,
-                        pokemon_id=pokemon_id
-                    )
-                    # Check if we have b64_json or need to get from url
-                    if hasattr(response.data[0], 'b64_json') and response.data[0].b64_json:
-                        return response.data[0].b64_json
-                    elif hasattr(response.data[0], 'url') and response.data[0].url:
-                        # If we get a URL, we need to download and convert to base64
-                        import base64
-                        import requests as req
-                        img_response = req.get(response.data[0].url)
-                        return base64.b64encode(img_response.content).decode('utf-8')
-            except Exception as e2:
-                logger.error(f"Error generating image with gpt-image-1 (low quality fallback): {e2}")
-                return None
+                return self.generate_image_with_quality(prompt, quality, size, recipe_id, pokemon_id)
+            except Exception as e:
+                logger.error(f"Error generating image with gpt-image-1 ({quality} quality): {e}")
+        return None
 
 
 # Create global instance
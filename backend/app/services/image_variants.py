@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+from PIL import Image
+from ..config import settings
+from .blob_store import ImageBlobStore, IMAGE_URL_PREFIX, image_blob_store
+from .single_flight import SingleFlight
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+VARIANT_WIDTHS = (128, 256, 512)
+VARIANT_QUALITY = 80
+
+
+def render_variant(source_path: str, dest_path: str, width: int) -> str:
+    """Downscale an image to fit width x width and save it as WebP (runs in a worker process)."""
+    with Image.open(source_path) as image:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.thumbnail((width, width), Image.Resampling.LANCZOS)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        image.save(tmp_path, "WEBP", quality=VARIANT_QUALITY, method=4)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+class ImageVariantService:
+    """
+    Downscaled WebP variants of stored images.
+
+    Variants live next to their blob (root/ab/<digest>.<width>.webp) and are
+    rendered in a process pool: eagerly when an image is saved, or lazily
+    the first time a missing variant is requested.
+    """
+
+    def __init__(self, store: ImageBlobStore, max_workers: int):
+        self.store = store
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Created lazily from server threads: forking a threaded process
+                # can deadlock the children, so workers are spawned instead
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def variant_path(self, digest: str, width: int) -> str:
+        return f"{self.store.path_for(digest)}.{width}.webp"
+
+    @staticmethod
+    def variant_url(digest: str, width: int) -> str:
+        return f"{IMAGE_URL_PREFIX}{digest}/{width}.webp"
+
+    def variants_for(self, image_url: Optional[str]) -> Optional[Dict[int, str]]:
+        """Return {width: url} for a blob-store image URL, or None for other URLs."""
+        if not image_url or not image_url.startswith(IMAGE_URL_PREFIX):
+            return None
+        digest = image_url[len(IMAGE_URL_PREFIX):]
+        if not self.store.is_digest(digest):
+            return None
+        return {width: self.variant_url(digest, width) for width in VARIANT_WIDTHS}
+
+    def _render(self, digest: str, width: int) -> Future:
+        return self._get_executor().submit(
+            render_variant, self.store.path_for(digest), self.variant_path(digest, width), width
+        )
+
+    def submit(self, digest: str):
+        """Render every missing variant of a stored image in the background."""
+        for width in VARIANT_WIDTHS:
+            if not os.path.exists(self.variant_path(digest, width)):
+                future = self._render(digest, width)
+                future.add_done_callback(lambda done, width=width: self._log_failure(done, digest, width))
+
+    @staticmethod
+    def _log_failure(future: Future, digest: str, width: int):
+        if future.exception() is not None:
+            logger.error(f"Error rendering {width}px variant of image {digest}: {future.exception()}")
+
+    async def aensure_variant(self, digest: str, width: int) -> str:
+        """Return the path of a variant, rendering it first if it is missing."""
+        path = self.variant_path(digest, width)
+        if os.path.exists(path):
+            return path
+        return await self._flights.ado(
+            (digest, width), lambda: asyncio.wrap_future(self._render(digest, width))
+        )
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+image_variants = ImageVariantService(image_blob_store, max_workers=settings.image_variant_workers)
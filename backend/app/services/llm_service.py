@@ -1,13 +1,97 @@
+import json
+import time
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage
 from langchain_core.output_parsers import JsonOutputParser
-from typing import Dict, Any, Optional, List
+from langchain_core.outputs import ChatGeneration
+from typing import Dict, Any, Optional, List, Callable
 from ..config import settings
 from .usage_tracker import usage_tracker
+from .recipe_cache import recipe_cache
 from ..utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Both prompts share the same output schema (braces escaped for the template)
+RECIPE_JSON_SCHEMA = """{{
+    "title": "Nombre creativo de la receta",
+    "description": "Descripción breve que conecte el postre con el Pokémon (2-3 frases)",
+    "difficulty": "Fácil|Medio|Difícil",
+    "prep_time": <número en minutos>,
+    "ingredients": [
+        {{"item": "nombre del ingrediente", "quantity": "cantidad", "notes": "notas opcionales"}},
+        ...
+    ],
+    "instructions": [
+        "Instrucción del paso 1",
+        "Instrucción del paso 2",
+        ...
+    ],
+    "presentation": "Cómo presentar/decorar el postre para que parezca el Pokémon",
+    "thematic_connection": "Explicación de cómo la receta refleja las características del Pokémon"
+}}"""
+
+# System prompts contain no variables so every request shares the same
+# prefix. OpenAI only caches prompts of 1024 tokens or more, though, and the
+# recipe system prompt is ~550 tokens (refine ~240), so today these prefixes
+# are never cache hits and cached_prompt_tokens stays 0. Keeping them static
+# lets caching engage without further changes if the prompts grow past that.
+# Padding them just to reach it would not pay: 1024 tokens at the cached rate
+# cost about as much as ~550 uncached, and every cache miss would cost more.
+RECIPE_SYSTEM_PROMPT = """Eres un chef pastelero creativo especializado en postres temáticos de Pokémon.
+
+INSTRUCCIONES para generar la receta (Chain-of-Thought):
+
+Piensa paso a paso aplicando el siguiente proceso de razonamiento:
+
+1. **Análisis del Pokémon:** Identifica características clave (tipos, color, hábitat). ¿Cómo traducir esto a sabores, texturas y presentaciones culinarias? (Ej: tipos fuego podrían sugerir sabores calientes/dulces como canela o chile).
+
+2. **Inspiración Temática:** Basado en el análisis, crea conexiones conceptuales. ¿Qué postre reflejaría la apariencia y personalidad del Pokémon? Considera elementos visuales (colores, formas) y simbólicos (tipo elemental).
+
+3. **Diseño de Receta:** Estructura básica: postre principal, decoraciones, dificultades basadas en complejidad de elementos temáticos. Asegura que sea ejecutable con ingredientes chileno-comunes.
+
+4. **Validación Interna:** Chequea coherencia - ¿La receta honra al Pokémon? ¿Es única y atractiva? ¿Cumple restricciones dietéticas?
+
+Luego de este razonamiento, proporciona ÚNICAMENTE el JSON final con la estructura requerida.
+IMPORTANTE:
+- Responde COMPLETAMENTE en español de América Latina, usando tildes y terminaciones correctas (ej: "postre" no "postre", "tú" no "tu").
+- Utilizar ÚNICAMENTE ingredientes comunes y fáciles de encontrar en supermercados de Chile (frutillas, uvas, manzanas, duraznos, pisco chileno, vino chileno, harina, azúcar, leche, huevos, etc. - evita ingredientes exóticos o difíciles de conseguir)
+
+Responde con un objeto JSON con la siguiente estructura:
+""" + RECIPE_JSON_SCHEMA
+
+RECIPE_HUMAN_PROMPT = """Información del Pokémon:
+- Nombre: {name}
+- Tipos: {types}
+- Color: {color}
+- Hábitat: {habitat}
+- Descripción: {description}
+
+{preferences}
+{dessert_preference}"""
+
+REFINE_SYSTEM_PROMPT = """Eres un chef pastelero especializado en refinar recipes temáticas de Pokémon.
+
+INSTRUCCIONES:
+- Corrige los errores específicos mencionados (completa campos faltantes, valida lógica)
+- Mantén la creatividad y conexión temática original
+- Responde ÚNICAMENTE con el JSON completado y corregido usando la estructura exacta
+
+""" + RECIPE_JSON_SCHEMA
+
+REFINE_HUMAN_PROMPT = """Recipe incompleta actual:
+{recipe_json}
+
+Errores encontrados:
+{errors}
+
+Información del Pokémon:
+- Nombre: {name}
+- Tipos: {types}
+- Color: {color}
+- Hábitat: {habitat}"""
+
 
 class LLMService:
     """Service for LLM interactions using LangChain."""
@@ -17,25 +101,31 @@ class LLMService:
             model="gpt-4o",
             temperature=0.8,
             api_key=settings.openai_api_key,
-            model_kwargs={"response_format": {"type": "json_object"}}
+            model_kwargs={"response_format": {"type": "json_object"}},
+            # Include token usage in the final chunk when streaming
+            stream_usage=True
         )
-        
-    def generate_recipe(
+        self.parser = JsonOutputParser()
+        self._build_chains()
+
+    def _build_chains(self):
+        """Compile the prompt | llm chains once; they are reused by every call."""
+        # The JSON output is parsed separately so the message's usage metadata is kept
+        self.recipe_chain = ChatPromptTemplate.from_messages([
+            ("system", RECIPE_SYSTEM_PROMPT),
+            ("human", RECIPE_HUMAN_PROMPT)
+        ]) | self.llm
+        self.refine_chain = ChatPromptTemplate.from_messages([
+            ("system", REFINE_SYSTEM_PROMPT),
+            ("human", REFINE_HUMAN_PROMPT)
+        ]) | self.llm
+
+    def _recipe_inputs(
         self,
         pokemon_data: Dict[str, Any],
-        preferences: Dict[str, Any] = None,
-        recipe_id: Optional[int] = None
+        preferences: Dict[str, Any] = None
     ) -> Dict[str, Any]:
-        """
-        Generate a recipe based on Pokemon attributes.
-
-        Args:
-            pokemon_data: Pokemon attributes
-            preferences: User preferences (optional)
-
-        Returns:
-            Dict with recipe data
-        """
+        """Build the template variables for recipe generation."""
         # Build preference string
         pref_text = ""
         dessert_pref = ""
@@ -56,107 +146,209 @@ class LLMService:
                 if dessert_description and str(dessert_description).lower() != 'none':
                     dessert_pref = f"Descripción del postre deseado: {dessert_description}."
 
-        # Create prompt template
-        template = """Eres un chef pastelero creativo especializado en postres temáticos de Pokémon.
-
-Información del Pokémon:
-- Nombre: {name}
-- Tipos: {types}
-- Color: {color}
-- Hábitat: {habitat}
-- Descripción: {description}
+        return {
+            "name": pokemon_data.get("name", "").title(),
+            "types": ", ".join(pokemon_data.get("types", [])),
+            "color": pokemon_data.get("color", "unknown"),
+            "habitat": pokemon_data.get("habitat", "unknown"),
+            "description": pokemon_data.get("description", "Un Pokémon misterioso"),
+            "preferences": pref_text or "Sin preferencias específicas.",
+            "dessert_preference": dessert_pref
+        }
+
+    def _track_usage(
+        self,
+        result: Dict[str, Any],
+        message: AIMessage,
+        started: float,
+        pokemon_data: Dict[str, Any],
+        recipe_id: Optional[int] = None,
+        request_type: str = "recipe_generation",
+        first_token_at: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Record the measured token usage and latency of a call and attach it as result["_usage"]."""
+        latency_ms = int((time.perf_counter() - started) * 1000)
+
+        usage = message.usage_metadata or {}
+        if not usage:
+            logger.warning(f"No usage metadata in {request_type} response; recording zero tokens")
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        total_tokens = prompt_tokens + completion_tokens
+        # Prompt tokens served from the provider's prompt cache are billed at a discount
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+        cost = usage_tracker.track_llm_usage(
+            model=self.llm.model_name,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_prompt_tokens=cached_tokens,
+            recipe_id=recipe_id,
+            pokemon_id=pokemon_data.get("id"),
+            request_type=request_type,
+            latency_ms=latency_ms
+        )
 
-{preferences}
-{dessert_preference}
+        result["_usage"] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "cost_usd": cost,
+            "latency_ms": latency_ms
+        }
+        if first_token_at is not None:
+            result["_usage"]["time_to_first_token_ms"] = int((first_token_at - started) * 1000)
+
+        return result
+
+    def _error_recipe(self, error: Exception) -> Dict[str, Any]:
+        """Placeholder recipe returned when generation fails."""
+        return {
+            "error": str(error),
+            "title": "Error generating recipe",
+            "description": "An error occurred during recipe generation",
+            "difficulty": "Medium",
+            "prep_time": 0,
+            "ingredients": [],
+            "instructions": [],
+            "presentation": "",
+            "thematic_connection": ""
+        }
+
+    def _lookup_cached_recipe(
+        self,
+        pokemon_data: Dict[str, Any],
+        preferences: Dict[str, Any] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached recipe for the prompt inputs, or None."""
+        if not settings.recipe_cache_enabled or pokemon_data.get("id") is None:
+            return None
+
+        cached = recipe_cache.get(recipe_cache.make_key(pokemon_data["id"], preferences))
+        if cached is not None:
+            cached["_usage"] = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost_usd": 0.0}
+            cached["_cached"] = True
+        return cached
+
+    def remember_recipe(
+        self,
+        pokemon_data: Dict[str, Any],
+        preferences: Optional[Dict[str, Any]],
+        recipe: Any
+    ):
+        """
+        Add a recipe that passed validation to the response cache.
 
-INSTRUCCIONES para generar la receta (Chain-of-Thought):
+        Called by the workflow after validation rather than on every LLM
+        response, so a malformed variant is never replayed from the cache.
+        Recipes that were themselves served from the cache are skipped.
+        """
+        if (
+            not settings.recipe_cache_enabled
+            or pokemon_data.get("id") is None
+            or not isinstance(recipe, dict)
+            or recipe.get("_cached")
+        ):
+            return
+        recipe_cache.add(recipe_cache.make_key(pokemon_data["id"], preferences), recipe)
+
+    def _as_recipe(self, result: Any) -> Dict[str, Any]:
+        """Return parsed output if it is a JSON object, else an error recipe."""
+        if isinstance(result, dict):
+            return result
+        return self._error_recipe(ValueError(f"Expected a JSON object, got {type(result).__name__}"))
 
-Piensa paso a paso aplicando el siguiente proceso de razonamiento:
+    def generate_recipe(
+        self,
+        pokemon_data: Dict[str, Any],
+        preferences: Dict[str, Any] = None,
+        recipe_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a recipe based on Pokemon attributes.
 
-1. **Análisis del Pokémon:** Identifica características clave (tipos: {types}, color: {color}, hábitat: {habitat}). ¿Cómo traducir esto a sabores, texturas y presentaciones culinarias? (Ej: tipos fuego podrían sugerir sabores calientes/dulces como canela o chile).
+        Args:
+            pokemon_data: Pokemon attributes
+            preferences: User preferences (optional)
 
-2. **Inspiración Temática:** Basado en el análisis, crea conexiones conceptuales. ¿Qué postre reflejaría la apariencia y personalidad de {name}? Considera elementos visuales (colores, formas) y simbólicos (tipo elemental).
+        Returns:
+            Dict with recipe data
+        """
+        cached = self._lookup_cached_recipe(pokemon_data, preferences)
+        if cached is not None:
+            return cached
 
-3. **Diseño de Receta:** Estructura básica: postre principal, decoraciones, dificultades basadas en complejidad de elementos temáticos. Asegura que sea ejecutable con ingredientes chileno-comunes.
+        try:
+            started = time.perf_counter()
+            message = self.recipe_chain.invoke(self._recipe_inputs(pokemon_data, preferences))
+            result = self._as_recipe(self.parser.invoke(message))
+            return self._track_usage(result, message, started, pokemon_data, recipe_id)
+        except Exception as e:
+            logger.error(f"Error generating recipe for Pokemon {pokemon_data.get('name')}: {e}")
+            return self._error_recipe(e)
 
-4. **Validación Interna:** Chequea coherencia - ¿La receta honra al Pokémon? ¿Es única y atractiva? ¿Cumple restricciones dietéticas?
+    async def agenerate_recipe(
+        self,
+        pokemon_data: Dict[str, Any],
+        preferences: Dict[str, Any] = None,
+        recipe_id: Optional[int] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate_recipe.
 
-Luego de este razonamiento, proporciona ÚNICAMENTE el JSON final con la estructura requerida.
-IMPORTANTE:
-- Responde COMPLETAMENTE en español de América Latina, usando tildes y terminaciones correctas (ej: "postre" no "postre", "tú" no "tu").
-- Utilizar ÚNICAMENTE ingredientes comunes y fáciles de encontrar en supermercados de Chile (frutillas, uvas, manzanas, duraznos, pisco chileno, vino chileno, harina, azúcar, leche, huevos, etc. - evita ingredientes exóticos o difíciles de conseguir)
+        When on_partial is given the model output is streamed and the callback
+        receives the incrementally parsed recipe after every change.
+        """
+        cached = self._lookup_cached_recipe(pokemon_data, preferences)
+        if cached is not None:
+            if on_partial is not None:
+                on_partial(cached)
+            return cached
 
-Responde con un objeto JSON con la siguiente estructura:
-{{
-    "title": "Nombre creativo de la receta",
-    "description": "Descripción breve que conecte el postre con el Pokémon (2-3 frases)",
-    "difficulty": "Fácil|Medio|Difícil",
-    "prep_time": <número en minutos>,
-    "ingredients": [
-        {{"item": "nombre del ingrediente", "quantity": "cantidad", "notes": "notas opcionales"}},
-        ...
-    ],
-    "instructions": [
-        "Instrucción del paso 1",
-        "Instrucción del paso 2",
-        ...
-    ],
-    "presentation": "Cómo presentar/decorar el postre para que parezca el Pokémon",
-    "thematic_connection": "Explicación de cómo la receta refleja las características del Pokémon"
-}}"""
-        
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        # Create chain with JSON output parser
-        parser = JsonOutputParser()
-        chain = prompt | self.llm | parser
-        
         try:
-            chain = prompt | self.llm | parser
-            result = chain.invoke({
-                "name": pokemon_data.get("name", "").title(),
-                "types": ", ".join(pokemon_data.get("types", [])),
-                "color": pokemon_data.get("color", "unknown"),
-                "habitat": pokemon_data.get("habitat", "unknown"),
-                "description": pokemon_data.get("description", "Un Pokémon misterioso"),
-                "preferences": pref_text or "Sin preferencias específicas.",
-                "dessert_preference": dessert_pref
-            })
-
-            prompt_tokens = 800
-            completion_tokens = 600
-            total_tokens = prompt_tokens + completion_tokens
-
-            cost = usage_tracker.track_llm_usage(
-                model="gpt-4o",
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                recipe_id=recipe_id,
-                pokemon_id=pokemon_data.get("id")
-            )
-
-            result["_usage"] = {
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "total_tokens": total_tokens,
-                "cost_usd": cost
-            }
-
-            return result
+            inputs = self._recipe_inputs(pokemon_data, preferences)
+            started = time.perf_counter()
+            first_token_at = None
+            if on_partial is None:
+                message = await self.recipe_chain.ainvoke(inputs)
+            else:
+                message = None
+                last_partial = None
+                async for chunk in self.recipe_chain.astream(inputs):
+                    message = chunk if message is None else message + chunk
+                    if first_token_at is None and chunk.content:
+                        first_token_at = time.perf_counter()
+                    partial = self.parser.parse_result([ChatGeneration(message=message)], partial=True)
+                    if isinstance(partial, dict) and partial != last_partial:
+                        last_partial = partial
+                        on_partial(partial)
+                if message is None:
+                    raise ValueError("Empty response from LLM")
+
+            result = self._as_recipe(self.parser.parse_result([ChatGeneration(message=message)]))
+            return self._track_usage(result, message, started, pokemon_data, recipe_id, first_token_at=first_token_at)
         except Exception as e:
             logger.error(f"Error generating recipe for Pokemon {pokemon_data.get('name')}: {e}")
-            return {
-                "error": str(e),
-                "title": "Error generating recipe",
-                "description": "An error occurred during recipe generation",
-                "difficulty": "Medium",
-                "prep_time": 0,
-                "ingredients": [],
-                "instructions": [],
-                "presentation": "",
-                "thematic_connection": ""
-            }
+            return self._error_recipe(e)
     
+    def _refine_inputs(
+        self,
+        incomplete_recipe: Dict[str, Any],
+        pokemon_data: Dict[str, Any],
+        errors: List[str]
+    ) -> Dict[str, Any]:
+        """Build the template variables for recipe refinement."""
+        return {
+            "recipe_json": json.dumps(incomplete_recipe, ensure_ascii=False),
+            "errors": "\n".join([f"- {e}" for e in errors]),
+            "name": pokemon_data.get("name", "").title(),
+            "types": ", ".join(pokemon_data.get("types", [])),
+            "color": pokemon_data.get("color", "unknown"),
+            "habitat": pokemon_data.get("habitat", "unknown")
+        }
+
     def refine_recipe(
         self,
         incomplete_recipe: Dict[str, Any],
@@ -175,80 +367,40 @@ Responde con un objeto JSON con la siguiente estructura:
         Returns:
             Refined recipe dict
         """
-        template = """Eres un chef pastelero especializado en refinar recipes temáticas de Pokémon.
-
-Recipe incompleta actual:
-{recipe_json}
-
-Errores encontrados:
-{errors}
-
-Información del Pokémon:
-- Nombre: {name}
-- Tipos: {types}
-- Color: {color}
-- Hábitat: {habitat}
-
-INSTRUCCIONES:
-- Corrige los errores específicos mencionados (completa campos faltantes, valida lógica)
-- Mantén la creatividad y conexión temática original
-- Responde ÚNICAMENTE con el JSON completado y corregido usando la estructura exacta
-
-{{
-    "title": "Nombre creativo de la receta",
-    "description": "Descripción breve que conecte el postre con el Pokémon (2-3 frases)",
-    "difficulty": "Fácil|Medio|Difícil",
-    "prep_time": <número en minutos>,
-    "ingredients": [
-        {{"item": "nombre del ingrediente", "quantity": "cantidad", "notes": "notas opcionales"}},
-        ...
-    ],
-    "instructions": [
-        "Instrucción del paso 1",
-        "Instrucción del paso 2",
-        ...
-    ],
-    "presentation": "Cómo presentar/decorar el postre para que parezca el Pokémon",
-    "thematic_connection": "Explicación de cómo la receta refleja las características del Pokémon"
-}}"""
-
-        prompt = ChatPromptTemplate.from_template(template)
-        parser = JsonOutputParser()
-        chain = prompt | self.llm | parser
-
-        import json
         try:
-            result = chain.invoke({
-                "recipe_json": json.dumps(incomplete_recipe, ensure_ascii=False),
-                "errors": "\n".join([f"- {e}" for e in errors]),
-                "name": pokemon_data.get("name", "").title(),
-                "types": ", ".join(pokemon_data.get("types", [])),
-                "color": pokemon_data.get("color", "unknown"),
-                "habitat": pokemon_data.get("habitat", "unknown")
-            })
-
-            # Smaller token usage estimate for refinement
-            prompt_tokens = 400
-            completion_tokens = 300
-            total_tokens = prompt_tokens + completion_tokens
-
-            if recipe_id:
-                cost = usage_tracker.track_llm_usage(
-                    model="gpt-4o",
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    recipe_id=recipe_id,
-                    pokemon_id=pokemon_data.get("id")
-                )
-
-                result["_usage"] = {
-                    "prompt_tokens": prompt_tokens,
-                    "completion_tokens": completion_tokens,
-                    "total_tokens": total_tokens,
-                    "cost_usd": cost
-                }
+            started = time.perf_counter()
+            message = self.refine_chain.invoke(self._refine_inputs(incomplete_recipe, pokemon_data, errors))
+            result = self._as_recipe(self.parser.invoke(message))
+            refined = self._track_usage(
+                result, message, started, pokemon_data, recipe_id, request_type="recipe_refinement"
+            )
+            if "error" in refined:
+                logger.error(f"Error refining recipe for Pokemon {pokemon_data.get('name')}: {refined['error']}")
+                return incomplete_recipe  # Graceful fallback
+            return refined
+        except Exception as e:
+            logger.error(f"Error refining recipe for Pokemon {pokemon_data.get('name')}: {e}")
+            return incomplete_recipe  # Graceful fallback
 
-            return result
+    async def arefine_recipe(
+        self,
+        incomplete_recipe: Dict[str, Any],
+        pokemon_data: Dict[str, Any],
+        errors: List[str],
+        recipe_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Async variant of refine_recipe (uses refine_chain.ainvoke)."""
+        try:
+            started = time.perf_counter()
+            message = await self.refine_chain.ainvoke(self._refine_inputs(incomplete_recipe, pokemon_data, errors))
+            result = self._as_recipe(self.parser.invoke(message))
+            refined = self._track_usage(
+                result, message, started, pokemon_data, recipe_id, request_type="recipe_refinement"
+            )
+            if "error" in refined:
+                logger.error(f"Error refining recipe for Pokemon {pokemon_data.get('name')}: {refined['error']}")
+                return incomplete_recipe  # Graceful fallback
+            return refined
         except Exception as e:
             logger.error(f"Error refining recipe for Pokemon {pokemon_data.get('name')}: {e}")
             return incomplete_recipe  # Graceful fallback
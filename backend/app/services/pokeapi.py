@@ -1,12 +1,23 @@
+import asyncio
+import threading
 import requests
+import httpx
 import json
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from ..config import settings
 from ..database import SessionLocal
 from ..models import PokemonCache
 from ..utils.logger import setup_logger
+from ..utils.pokeapi_projection import project_cache_entry, SPECIES_CACHE_PREFIX
+from .memory_cache import LRUCache
+from .pokemon_index import PokemonNameIndex, MAX_POKEMON_ID
+from .single_flight import SingleFlight
 
 logger = setup_logger(__name__)
 
@@ -14,101 +25,379 @@ logger = setup_logger(__name__)
 class PokeAPIService:
     """Service for interacting with PokéAPI."""
 
+    # Listing used to build the local name index (IDs 1..MAX_POKEMON_ID, no alternate forms)
+    NAME_INDEX_LISTING_PATH = f"/pokemon?limit={MAX_POKEMON_ID}&offset=0"
+
     def __init__(self):
         self.base_url = settings.pokeapi_base_url
-        self.cache_ttl_hours = 24
-        
-    def _get_from_cache(self, name: str, db: Session) -> Optional[Dict[str, Any]]:
-        """Get Pokemon data from cache if not expired."""
+        self.cache_soft_ttl = timedelta(hours=settings.pokemon_cache_soft_ttl_hours)
+        self.cache_hard_ttl = timedelta(hours=settings.pokemon_cache_hard_ttl_hours)
+        self.memory_cache = LRUCache(
+            max_entries=settings.pokemon_memory_cache_size,
+            ttl_seconds=settings.pokemon_memory_cache_ttl_seconds
+        )
+        self.name_index: Optional[PokemonNameIndex] = None
+
+        # Concurrent misses for the same key share one fetch and one cache write
+        self._flights = SingleFlight()
+
+        # Keys with a background stale-while-revalidate refresh in progress
+        self._refreshing: Set[str] = set()
+        self._refreshing_lock = threading.Lock()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+        # Shared keep-alive pool for the sync API
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.pokeapi_max_keepalive_connections,
+            pool_maxsize=settings.pokeapi_max_connections
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Worker threads for overlapping sync lookups
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pokeapi")
+
+        # Async client is created lazily inside the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the shared async client, recreating it if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    settings.pokeapi_timeout_seconds,
+                    connect=settings.pokeapi_connect_timeout_seconds
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.pokeapi_max_connections,
+                    max_keepalive_connections=settings.pokeapi_max_keepalive_connections
+                )
+            )
+            self._async_loop = loop
+            self._host_semaphores = {}
+        return self._async_client
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Return the concurrency limiter for the host of a URL."""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.pokeapi_max_concurrency_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def aclose(self):
+        """Close the shared async client (called on application shutdown)."""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_loop = None
+
+    def _fetch_json(self, path: str) -> Dict[str, Any]:
+        """GET a PokéAPI path using the pooled sync session."""
+        response = self.session.get(
+            f"{self.base_url}{path}",
+            timeout=(settings.pokeapi_connect_timeout_seconds, settings.pokeapi_timeout_seconds)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _afetch_json(self, path: str) -> Dict[str, Any]:
+        """GET a PokéAPI path using the pooled async client."""
+        url = f"{self.base_url}{path}"
+        client = self._get_async_client()
+        async with self._get_host_semaphore(url):
+            response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def _get_from_cache(self, name: str, db: Session) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Get Pokemon data from cache.
+
+        Returns:
+            (data, is_stale). Entries past the soft TTL are returned as stale
+            while stale-while-revalidate is enabled; entries past the hard TTL
+            (or the soft TTL when it is disabled) are deleted and reported as a miss.
+        """
         cache_entry = db.query(PokemonCache).filter(PokemonCache.name == name.lower()).first()
 
         if cache_entry:
-            cache_age = datetime.utcnow() - cache_entry.cached_at
-            if cache_age < timedelta(hours=self.cache_ttl_hours):
-                return json.loads(cache_entry.data)
-            else:
-                db.delete(cache_entry)
-                db.commit()
+            return self._read_entry(cache_entry, db)
+
+        return None, False
 
-        return None
+    def _get_many_from_cache(
+        self,
+        names: List[str],
+        db: Session
+    ) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """Get several cache entries with a single query (same expiry rules as _get_from_cache)."""
+        entries = db.query(PokemonCache).filter(PokemonCache.name.in_([n.lower() for n in names])).all()
+
+        found = {}
+        for cache_entry in entries:
+            data, is_stale = self._read_entry(cache_entry, db)
+            if data:
+                found[cache_entry.name] = (data, is_stale)
+        return found
+
+    def _read_entry(self, cache_entry: PokemonCache, db: Session) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Apply soft/hard TTL rules to a loaded cache row."""
+        cache_age = datetime.utcnow() - cache_entry.cached_at
+        if cache_age < self.cache_soft_ttl:
+            data = json.loads(cache_entry.data)
+            self.memory_cache.set(cache_entry.name, data)
+            return data, False
+        elif settings.pokemon_cache_stale_while_revalidate and cache_age < self.cache_hard_ttl:
+            return json.loads(cache_entry.data), True
+        else:
+            self.memory_cache.delete(cache_entry.name)
+            db.delete(cache_entry)
+            db.commit()
+            return None, False
 
     def _save_to_cache(self, name: str, data: Dict[str, Any], db: Session):
-        """Save Pokemon data to cache."""
+        """Save projected Pokemon data to cache, replacing any existing entry."""
         try:
-            cache_entry = PokemonCache(
-                name=name.lower(),
-                data=json.dumps(data)
-            )
-            db.add(cache_entry)
+            payload = json.dumps(data, separators=(",", ":"))
+            cache_entry = db.query(PokemonCache).filter(PokemonCache.name == name.lower()).first()
+            if cache_entry:
+                cache_entry.data = payload
+                cache_entry.cached_at = datetime.utcnow()
+            else:
+                db.add(PokemonCache(name=name.lower(), data=payload))
             db.commit()
+            self.memory_cache.set(name.lower(), data)
+        except IntegrityError:
+            # Another worker process cached the same entry first
+            db.rollback()
+            self.memory_cache.set(name.lower(), data)
         except Exception as e:
             logger.error(f"Error saving Pokemon to cache: {e}")
             db.rollback()
 
-    def get_pokemon(self, identifier: int | str) -> Optional[Dict[str, Any]]:
+    def get_fresh_cache_keys(self, cache_keys: list[str]) -> set[str]:
+        """Return which of the given cache keys have a non-expired DB entry."""
+        cutoff = datetime.utcnow() - self.cache_soft_ttl
+        db = SessionLocal()
+        try:
+            rows = db.query(PokemonCache.name).filter(
+                PokemonCache.name.in_([key.lower() for key in cache_keys]),
+                PokemonCache.cached_at >= cutoff
+            ).all()
+            return {row.name for row in rows}
+        finally:
+            db.close()
+
+    def bulk_save_to_cache(self, entries: Dict[str, Dict[str, Any]]) -> int:
         """
-        Fetch Pokemon data from PokéAPI.
+        Replace cache entries in a single transaction.
 
         Args:
-            identifier: Pokemon ID or name
+            entries: Raw or projected payloads keyed by cache key
 
         Returns:
-            Dict with Pokemon data or None if not found
+            Number of entries written
         """
         db = SessionLocal()
         try:
-            cache_key = str(identifier).lower()
-            cached_data = self._get_from_cache(cache_key, db)
+            projected = {key.lower(): project_cache_entry(key.lower(), data) for key, data in entries.items()}
+            db.query(PokemonCache).filter(
+                PokemonCache.name.in_(list(projected))
+            ).delete(synchronize_session=False)
+            for key, data in projected.items():
+                db.add(PokemonCache(name=key, data=json.dumps(data, separators=(",", ":"))))
+            db.commit()
+
+            for key, data in projected.items():
+                self.memory_cache.set(key, data)
+            return len(projected)
+        except Exception as e:
+            logger.error(f"Error bulk saving Pokemon cache entries: {e}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    def _read_cache(self, cache_key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Read a cache entry using its own session."""
+        db = SessionLocal()
+        try:
+            return self._get_from_cache(cache_key, db)
+        finally:
+            db.close()
+
+    def _read_cache_many(self, cache_keys: List[str]) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """Read several cache entries using their own session."""
+        db = SessionLocal()
+        try:
+            return self._get_many_from_cache(cache_keys, db)
+        finally:
+            db.close()
+
+    def _write_cache(self, cache_key: str, data: Dict[str, Any]):
+        """Write a cache entry using its own session."""
+        db = SessionLocal()
+        try:
+            self._save_to_cache(cache_key, data, db)
+        finally:
+            db.close()
+
+    def _cached_fetch(self, cache_key: str, path: str, label: str) -> Optional[Dict[str, Any]]:
+        """Return cached data for a key, fetching and caching it on a miss."""
+        cached_data = self.memory_cache.get(cache_key)
+        if cached_data:
+            return cached_data
+
+        return self._flights.do(cache_key, self._load_or_fetch, cache_key, path, label)
+
+    def _load_or_fetch(self, cache_key: str, path: str, label: str) -> Optional[Dict[str, Any]]:
+        """Read the DB cache, falling back to PokéAPI (runs once per in-flight key)."""
+        db = SessionLocal()
+        try:
+            cached_data, is_stale = self._get_from_cache(cache_key, db)
 
             if cached_data:
+                if is_stale and self._begin_refresh(cache_key):
+                    self._executor.submit(self._refresh_entry, cache_key, path, label)
                 return cached_data
 
-            url = f"{self.base_url}/pokemon/{identifier}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = project_cache_entry(cache_key, self._fetch_json(path))
 
             self._save_to_cache(cache_key, data, db)
 
             return data
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching Pokemon {identifier} from API: {e}")
+            logger.error(f"Error fetching {label} from API: {e}")
             return None
         finally:
             db.close()
-    
-    def get_pokemon_species(self, identifier: int | str) -> Optional[Dict[str, Any]]:
+
+    async def _acached_fetch(self, cache_key: str, path: str, label: str) -> Optional[Dict[str, Any]]:
+        """Async variant of _cached_fetch; DB access runs in a worker thread."""
+        cached_data = self.memory_cache.get(cache_key)
+        if cached_data:
+            return cached_data
+
+        return await self._flights.ado(cache_key, self._aload_or_fetch, cache_key, path, label)
+
+    async def _aload_or_fetch(self, cache_key: str, path: str, label: str) -> Optional[Dict[str, Any]]:
+        """Async variant of _load_or_fetch."""
+        cached_data, is_stale = await asyncio.to_thread(self._read_cache, cache_key)
+
+        if cached_data:
+            if is_stale:
+                self._schedule_arefresh(cache_key, path, label)
+            return cached_data
+
+        data = await self._afetch_entry(cache_key, path, label)
+        if data:
+            await asyncio.to_thread(self._write_cache, cache_key, data)
+
+        return data
+
+    async def _afetch_entry(self, cache_key: str, path: str, label: str) -> Optional[Dict[str, Any]]:
+        """Fetch and project a cache entry from PokéAPI without touching the DB cache."""
+        try:
+            return project_cache_entry(cache_key, await self._afetch_json(path))
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching {label} from API: {e}")
+            return None
+
+    def _begin_refresh(self, cache_key: str) -> bool:
+        """Claim a background refresh for a key; False if one is already running."""
+        with self._refreshing_lock:
+            if cache_key in self._refreshing:
+                return False
+            self._refreshing.add(cache_key)
+            return True
+
+    def _end_refresh(self, cache_key: str):
+        with self._refreshing_lock:
+            self._refreshing.discard(cache_key)
+
+    def _refresh_entry(self, cache_key: str, path: str, label: str):
+        """Refetch a stale entry in the background, keeping the stale copy on failure."""
+        try:
+            data = project_cache_entry(cache_key, self._fetch_json(path))
+            self._write_cache(cache_key, data)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Background refresh of {label} failed, serving stale data: {e}")
+        finally:
+            self._end_refresh(cache_key)
+
+    def _schedule_arefresh(self, cache_key: str, path: str, label: str):
+        """Start a background refresh task for a stale key unless one is running."""
+        if self._begin_refresh(cache_key):
+            task = asyncio.create_task(self._arefresh_entry(cache_key, path, label))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _arefresh_entry(self, cache_key: str, path: str, label: str):
+        """Async variant of _refresh_entry."""
+        try:
+            data = project_cache_entry(cache_key, await self._afetch_json(path))
+            await asyncio.to_thread(self._write_cache, cache_key, data)
+        except httpx.HTTPError as e:
+            logger.warning(f"Background refresh of {label} failed, serving stale data: {e}")
+        finally:
+            self._end_refresh(cache_key)
+
+    def get_pokemon(self, identifier: int | str) -> Optional[Dict[str, Any]]:
         """
-        Fetch Pokemon species data (for color, habitat, etc).
+        Fetch Pokemon data from PokéAPI.
 
         Args:
             identifier: Pokemon ID or name
 
         Returns:
-            Dict with species data or None if not found
+            Dict with Pokemon data (projected to the fields the app reads)
+            or None if not found
         """
-        db = SessionLocal()
-        try:
-            cache_key = f"species_{str(identifier).lower()}"
-            cached_data = self._get_from_cache(cache_key, db)
+        return self._cached_fetch(
+            str(identifier).lower(),
+            f"/pokemon/{identifier}",
+            f"Pokemon {identifier}"
+        )
 
-            if cached_data:
-                return cached_data
+    async def aget_pokemon(self, identifier: int | str) -> Optional[Dict[str, Any]]:
+        """Async variant of get_pokemon."""
+        return await self._acached_fetch(
+            str(identifier).lower(),
+            f"/pokemon/{identifier}",
+            f"Pokemon {identifier}"
+        )
 
-            url = f"{self.base_url}/pokemon-species/{identifier}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+    def get_pokemon_species(self, identifier: int | str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch Pokemon species data (for color, habitat, etc).
 
-            self._save_to_cache(cache_key, data, db)
+        Args:
+            identifier: Pokemon ID or name
+
+        Returns:
+            Dict with species data (projected to the fields the app reads)
+            or None if not found
+        """
+        return self._cached_fetch(
+            f"{SPECIES_CACHE_PREFIX}{str(identifier).lower()}",
+            f"/pokemon-species/{identifier}",
+            f"Pokemon species {identifier}"
+        )
+
+    async def aget_pokemon_species(self, identifier: int | str) -> Optional[Dict[str, Any]]:
+        """Async variant of get_pokemon_species."""
+        return await self._acached_fetch(
+            f"{SPECIES_CACHE_PREFIX}{str(identifier).lower()}",
+            f"/pokemon-species/{identifier}",
+            f"Pokemon species {identifier}"
+        )
 
-            return data
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching Pokemon species {identifier} from API: {e}")
-            return None
-        finally:
-            db.close()
-    
     def extract_attributes(self, pokemon_id: int) -> Dict[str, Any]:
         """
         Extract relevant attributes for recipe generation.
@@ -119,14 +408,89 @@ class PokeAPIService:
         Returns:
             Dict with extracted attributes
         """
-        # Get basic Pokemon data
+        # Species data (color, habitat, etc) is fetched alongside the basic data
+        species_future = self._executor.submit(self.get_pokemon_species, pokemon_id)
         pokemon_data = self.get_pokemon(pokemon_id)
+        species_data = species_future.result()
+
         if not pokemon_data:
             return {}
 
-        # Get species data for additional attributes
-        species_data = self.get_pokemon_species(pokemon_id)
+        return self._build_attributes(pokemon_data, species_data)
+
+    async def aextract_attributes(self, pokemon_id: int) -> Dict[str, Any]:
+        """Async variant of extract_attributes."""
+        pokemon_data, species_data = await asyncio.gather(
+            self.aget_pokemon(pokemon_id),
+            self.aget_pokemon_species(pokemon_id)
+        )
+        if not pokemon_data:
+            return {}
+
+        return self._build_attributes(pokemon_data, species_data)
+
+    async def aextract_attributes_batch(self, pokemon_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Extract attributes for several Pokemon at once.
+
+        Cached entries are read with a single DB query; only the missing
+        ones are fetched from PokéAPI, concurrently, and written back in a
+        single transaction.
+
+        Args:
+            pokemon_ids: Pokemon IDs
+
+        Returns:
+            Dict mapping each found Pokemon ID to its attributes
+        """
+        lookups = {}
+        for pokemon_id in pokemon_ids:
+            lookups[str(pokemon_id)] = (f"/pokemon/{pokemon_id}", f"Pokemon {pokemon_id}")
+            lookups[f"{SPECIES_CACHE_PREFIX}{pokemon_id}"] = (
+                f"/pokemon-species/{pokemon_id}",
+                f"Pokemon species {pokemon_id}"
+            )
+
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        for cache_key in lookups:
+            cached_data = self.memory_cache.get(cache_key)
+            if cached_data:
+                found[cache_key] = cached_data
+
+        pending = [cache_key for cache_key in lookups if cache_key not in found]
+        if pending:
+            db_entries = await asyncio.to_thread(self._read_cache_many, pending)
+            for cache_key, (data, is_stale) in db_entries.items():
+                found[cache_key] = data
+                if is_stale:
+                    self._schedule_arefresh(cache_key, *lookups[cache_key])
 
+        # The batch read already showed these are not cached: go straight to the API
+        missing = [cache_key for cache_key in lookups if cache_key not in found]
+        fetched = await asyncio.gather(*(
+            self._flights.ado(cache_key, self._afetch_entry, cache_key, *lookups[cache_key])
+            for cache_key in missing
+        ))
+        found.update(zip(missing, fetched))
+
+        new_entries = {cache_key: data for cache_key, data in zip(missing, fetched) if data}
+        if new_entries:
+            await asyncio.to_thread(self.bulk_save_to_cache, new_entries)
+
+        results = {}
+        for pokemon_id in pokemon_ids:
+            pokemon_data = found.get(str(pokemon_id))
+            if pokemon_data:
+                species_data = found.get(f"{SPECIES_CACHE_PREFIX}{pokemon_id}")
+                results[pokemon_id] = self._build_attributes(pokemon_data, species_data)
+        return results
+
+    def _build_attributes(
+        self,
+        pokemon_data: Dict[str, Any],
+        species_data: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Project raw Pokemon and species payloads into recipe attributes."""
         # Extract types (with protection against None)
         types_data = pokemon_data.get("types") or []
         types = []
@@ -186,10 +550,70 @@ class PokeAPIService:
             "sprite": sprite
         }
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return statistics for the in-process Pokemon cache."""
+        return self.memory_cache.stats()
+
+    def _get_name_index(self) -> Optional[PokemonNameIndex]:
+        """Return the name index, loading the persisted copy on first use."""
+        if self.name_index is None:
+            try:
+                self.name_index = PokemonNameIndex.load(settings.pokemon_index_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Error loading Pokemon name index: {e}")
+        return self.name_index
+
+    def _store_name_index(self, data: Dict[str, Any]) -> PokemonNameIndex:
+        """Build the name index from a listing, persist it and swap it in."""
+        index = PokemonNameIndex.from_listing(data)
+        try:
+            index.save(settings.pokemon_index_path)
+        except OSError as e:
+            logger.error(f"Error saving Pokemon name index: {e}")
+        self.name_index = index
+        logger.info(f"Pokemon name index built with {len(index)} entries")
+        return index
+
+    def refresh_name_index(self) -> Optional[PokemonNameIndex]:
+        """Rebuild the name index from PokéAPI."""
+        try:
+            data = self._fetch_json(self.NAME_INDEX_LISTING_PATH)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error building Pokemon name index: {e}")
+            return None
+        return self._store_name_index(data)
+
+    async def arefresh_name_index(self) -> Optional[PokemonNameIndex]:
+        """Async variant of refresh_name_index."""
+        try:
+            data = await self._afetch_json(self.NAME_INDEX_LISTING_PATH)
+        except httpx.HTTPError as e:
+            logger.error(f"Error building Pokemon name index: {e}")
+            return None
+        return await asyncio.to_thread(self._store_name_index, data)
+
+    async def run_name_index_refresher(self):
+        """Keep the name index fresh; runs as a background task for the app lifetime."""
+        max_age = timedelta(hours=settings.pokemon_index_refresh_hours)
+        while True:
+            index = await asyncio.to_thread(self._get_name_index)
+            if index is None or index.is_stale(max_age):
+                index = await self.arefresh_name_index()
+
+            if index is None:
+                # PokéAPI unreachable: retry soon
+                delay = 300
+            else:
+                delay = max(60, (index.built_at + max_age - datetime.utcnow()).total_seconds())
+            await asyncio.sleep(delay)
+
     def search_pokemon(self, query: str, limit: int = 20) -> list[Dict[str, Any]]:
         """
-        Search for Pokemon by name prefix.
-        
+        Search for Pokemon by name using the local name index.
+
+        Prefix matches come first, then substring and fuzzy matches.
+        The index is built from PokéAPI only if no persisted copy exists.
+
         Args:
             query: Search query
             limit: Maximum number of results
@@ -197,31 +621,19 @@ class PokeAPIService:
         Returns:
             List of matching Pokemon
         """
-        try:
-            # Get list of all Pokemon
-            url = f"{self.base_url}/pokemon?limit=1000"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Filter by query
-            results = []
-            query_lower = query.lower()
-            for pokemon in data.get("results", []):
-                if query_lower in pokemon["name"].lower():
-                    # Extract ID from URL
-                    pokemon_id = pokemon["url"].rstrip("/").split("/")[-1]
-                    results.append({
-                        "id": int(pokemon_id),
-                        "name": pokemon["name"]
-                    })
-                    if len(results) >= limit:
-                        break
-            
-            return results
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error searching Pokemon with query '{query}': {e}")
+        index = self._get_name_index() or self.refresh_name_index()
+        if index is None:
+            return []
+        return index.search(query, limit)
+
+    async def asearch_pokemon(self, query: str, limit: int = 20) -> list[Dict[str, Any]]:
+        """Async variant of search_pokemon."""
+        index = self.name_index or await asyncio.to_thread(self._get_name_index)
+        if index is None:
+            index = await self.arefresh_name_index()
+        if index is None:
             return []
+        return index.search(query, limit)
 
 
 # Create global instance
@@ -0,0 +1,142 @@
+import json
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+# Highest Pokemon ID the app generates recipes for; alternate forms (10001+)
+# and newer IDs are left out of the index so every result can be selected
+MAX_POKEMON_ID = 1017
+
+
+class PokemonNameIndex:
+    """In-memory search index over Pokemon names (sorted prefix + trigram postings)."""
+
+    NGRAM_SIZE = 3
+    FUZZY_THRESHOLD = 0.4
+
+    def __init__(self, entries: List[Dict[str, Any]], built_at: Optional[datetime] = None):
+        self.built_at = built_at or datetime.utcnow()
+        self.entries = sorted(
+            (
+                {"id": int(e["id"]), "name": e["name"].lower()}
+                for e in entries
+                if 1 <= int(e["id"]) <= MAX_POKEMON_ID
+            ),
+            key=lambda e: e["name"]
+        )
+        self._names = [e["name"] for e in self.entries]
+
+        self._ngrams: Dict[str, List[int]] = defaultdict(list)
+        for position, name in enumerate(self._names):
+            for gram in self._grams(name, padded=True):
+                self._ngrams[gram].append(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def _grams(cls, text: str, padded: bool) -> Set[str]:
+        """Return the set of n-grams of text, optionally padded at word boundaries."""
+        if padded:
+            text = f" {text} "
+        n = cls.NGRAM_SIZE
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _collect(self, positions, limit: int, seen: Set[int]) -> List[Dict[str, Any]]:
+        """Return up to limit unseen entries ordered by Pokemon ID."""
+        selected = sorted((p for p in positions if p not in seen), key=lambda p: self.entries[p]["id"])[:limit]
+        seen.update(selected)
+        return [dict(self.entries[p]) for p in selected]
+
+    def _prefix_positions(self, query: str) -> range:
+        start = bisect_left(self._names, query)
+        end = bisect_left(self._names, query + "\uffff", lo=start)
+        return range(start, end)
+
+    def _substring_positions(self, query: str) -> List[int]:
+        if len(query) < self.NGRAM_SIZE:
+            return [p for p, name in enumerate(self._names) if query in name]
+
+        candidates: Optional[Set[int]] = None
+        for gram in self._grams(query, padded=False):
+            postings = set(self._ngrams.get(gram, ()))
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+        return [p for p in candidates if query in self._names[p]]
+
+    def _fuzzy_positions(self, query: str) -> List[int]:
+        query_grams = self._grams(query, padded=True)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for position in self._ngrams.get(gram, ()):
+                shared[position] += 1
+
+        scored = []
+        for position, count in shared.items():
+            name_grams = len(self._names[position]) + 3 - self.NGRAM_SIZE
+            score = 2 * count / (len(query_grams) + name_grams)
+            if score >= self.FUZZY_THRESHOLD:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], self.entries[item[1]]["id"]))
+        return [position for _, position in scored]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search names: prefix matches first, then substring, then fuzzy matches.
+
+        Args:
+            query: Search query
+            limit: Maximum number of results
+
+        Returns:
+            List of {"id", "name"} dicts
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        seen: Set[int] = set()
+        results = self._collect(self._prefix_positions(query), limit, seen)
+        if len(results) < limit:
+            results += self._collect(self._substring_positions(query), limit - len(results), seen)
+        if len(results) < limit:
+            fuzzy = [p for p in self._fuzzy_positions(query) if p not in seen][:limit - len(results)]
+            seen.update(fuzzy)
+            results += [dict(self.entries[p]) for p in fuzzy]
+        return results
+
+    def is_stale(self, max_age: timedelta) -> bool:
+        """Whether the index is older than max_age."""
+        return datetime.utcnow() - self.built_at >= max_age
+
+    def save(self, path: str):
+        """Persist the index entries to a JSON file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"built_at": self.built_at.isoformat(), "entries": self.entries}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PokemonNameIndex"]:
+        """Load a persisted index, or return None if the file is missing."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload["entries"], built_at=datetime.fromisoformat(payload["built_at"]))
+
+    @classmethod
+    def from_listing(cls, data: Dict[str, Any]) -> "PokemonNameIndex":
+        """Build an index from a PokéAPI /pokemon listing response."""
+        entries = []
+        for pokemon in data.get("results", []):
+            # Extract ID from URL
+            pokemon_id = pokemon["url"].rstrip("/").split("/")[-1]
+            entries.append({"id": int(pokemon_id), "name": pokemon["name"]})
+        return cls(entries)
@@ -0,0 +1,96 @@
+import copy
+import threading
+from typing import Any, Dict, Optional, Tuple
+from ..config import settings
+from .memory_cache import LRUCache
+
+RecipeCacheKey = Tuple[Any, ...]
+
+
+class RecipeResponseCache:
+    """
+    Cache of LLM-generated recipes keyed by normalized prompt inputs.
+
+    Variety policy: a key collects up to max_variants freshly generated
+    recipes; once full, requests are served from the cached variants in
+    round-robin order. Keys are evicted LRU-first and expire after a TTL.
+    """
+
+    def __init__(self, max_variants: int, max_keys: int, ttl_seconds: float):
+        self.max_variants = max_variants
+        self._entries = LRUCache(max_entries=max_keys, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        text = " ".join(str(value).lower().split())
+        return None if text in ("", "none") else text
+
+    @classmethod
+    def make_key(cls, pokemon_id: int, preferences: Optional[Dict[str, Any]]) -> RecipeCacheKey:
+        """Build a cache key from the inputs that shape the prompt."""
+        preferences = preferences or {}
+        dessert_type = cls._normalize(preferences.get("dessert_type"))
+        # The prompt only uses the free-text description when no type is chosen
+        dessert_description = None if dessert_type else cls._normalize(preferences.get("dessert_description"))
+        return (
+            pokemon_id,
+            cls._normalize(preferences.get("dietary")),
+            cls._normalize(preferences.get("complexity")),
+            dessert_type,
+            dessert_description
+        )
+
+    def get(self, key: RecipeCacheKey) -> Optional[Dict[str, Any]]:
+        """Return a cached variant if the key's variant pool is full, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if self.max_variants <= 0 or entry is None or len(entry["variants"]) < self.max_variants:
+                self.misses += 1
+                return None
+
+            variant = entry["variants"][entry["served"] % len(entry["variants"])]
+            entry["served"] += 1
+            self.hits += 1
+            return copy.deepcopy(variant)
+
+    def add(self, key: RecipeCacheKey, recipe: Dict[str, Any]):
+        """Store a freshly generated recipe as a variant for key."""
+        if self.max_variants <= 0:
+            return
+
+        variant = {k: v for k, v in recipe.items() if not k.startswith("_")}
+        with self._lock:
+            entry = self._entries.peek(key) or {"variants": [], "served": 0}
+            if len(entry["variants"]) < self.max_variants:
+                entry["variants"].append(copy.deepcopy(variant))
+            self._entries.set(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and storage statistics."""
+        entries = self._entries.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.recipe_cache_enabled,
+                "max_variants": self.max_variants,
+                "keys": entries["size"],
+                "max_keys": entries["max_entries"],
+                "ttl_seconds": entries["ttl_seconds"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": entries["evictions"],
+                "expirations": entries["expirations"],
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+recipe_cache = RecipeResponseCache(
+    max_variants=settings.recipe_cache_variants,
+    max_keys=settings.recipe_cache_max_keys,
+    ttl_seconds=settings.recipe_cache_ttl_hours * 3600
+)
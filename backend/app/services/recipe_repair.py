@@ -0,0 +1,236 @@
+import copy
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Canonical difficulty values requested by the recipe prompt
+DIFFICULTY_ALIASES = {
+    "facil": "Fácil",
+    "sencillo": "Fácil",
+    "sencilla": "Fácil",
+    "baja": "Fácil",
+    "bajo": "Fácil",
+    "easy": "Fácil",
+    "medio": "Medio",
+    "media": "Medio",
+    "intermedio": "Medio",
+    "intermedia": "Medio",
+    "moderado": "Medio",
+    "moderada": "Medio",
+    "medium": "Medio",
+    "dificil": "Difícil",
+    "alta": "Difícil",
+    "alto": "Difícil",
+    "avanzado": "Difícil",
+    "avanzada": "Difícil",
+    "hard": "Difícil",
+    "difficult": "Difícil",
+}
+DEFAULT_DIFFICULTY = "Medio"
+
+# Hours, optionally followed by bare minutes ("1h30", "1 hora y 15")
+HOURS_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:horas?|hours?|hrs?|h)(?![a-z])(?:\s*y?\s*(\d+)(?!\s*(?:min|m(?![a-z]))))?")
+MINUTES_PATTERN = re.compile(r"(\d+)\s*(?:min|m(?![a-z]))")
+NUMBER_PATTERN = re.compile(r"\d+")
+# Spoken and fractional amounts rewritten to decimal hours before parsing
+MIXED_FRACTION_PATTERN = re.compile(r"(\d+)\s+(\d+)/(\d+)")
+FRACTION_PATTERN = re.compile(r"(\d+)/(\d+)")
+HALF_HOUR_PATTERN = re.compile(r"\b(?:una\s+)?media\s+hora")
+QUARTER_HOUR_PATTERN = re.compile(r"\b(?:un\s+)?cuarto\s+de\s+hora")
+ONE_HOUR_PATTERN = re.compile(r"\buna?\s+hora")
+AND_A_HALF_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(horas?|h)\s+y\s+media\b")
+# Words that make a difficulty label ambiguous ("no muy difícil")
+NEGATION_WORDS = {"no", "ni", "sin", "not"}
+# "1. ", "2) ", "Paso 3:", "- ", "• " at the start of an instruction
+STEP_PREFIX_PATTERN = re.compile(r"^\s*(?:(?:paso|step)\s*\d+\s*[:.)-]?|\d+\s*[.)]|[-*•])\s*", re.IGNORECASE)
+# Numbered steps run together on one line: "1. Mezclar ... 2. Hornear ..."
+INLINE_STEP_PATTERN = re.compile(r"(?:^|\s)(?=\d+[.)]\s)")
+# Keys under which models sometimes nest the text of an instruction
+STEP_TEXT_KEYS = ("instruction", "step", "text", "description")
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+class RecipeRepairService:
+    """
+    Deterministic fixes for common schema problems in LLM-generated recipes.
+
+    Runs before validation so recipes that are only malformed (prep_time as
+    text, free-form difficulty, instructions as one string, ingredients
+    without notes) pass without a refine round trip to the model. Counters
+    are per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.repaired = 0
+        self.refines_avoided = 0
+        self.repairs: Dict[str, int] = {}
+
+    @staticmethod
+    def parse_prep_time(value: Any) -> Optional[int]:
+        """Parse a preparation time such as "45 minutos" or "1 hora 30 min" into minutes."""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return max(0, int(round(value)))
+        if not isinstance(value, str):
+            return None
+
+        text = _strip_accents(value.lower())
+        if any(int(d) == 0 for _, d in FRACTION_PATTERN.findall(text)):
+            return None
+        text = MIXED_FRACTION_PATTERN.sub(lambda m: str(int(m.group(1)) + int(m.group(2)) / int(m.group(3))), text)
+        text = FRACTION_PATTERN.sub(lambda m: str(int(m.group(1)) / int(m.group(2))), text)
+        text = HALF_HOUR_PATTERN.sub("0.5 hora", text)
+        text = QUARTER_HOUR_PATTERN.sub("0.25 hora", text)
+        text = ONE_HOUR_PATTERN.sub("1 hora", text)
+        text = AND_A_HALF_PATTERN.sub(lambda m: f"{float(m.group(1)) + 0.5} hora", text)
+
+        hours = HOURS_PATTERN.search(text)
+        minutes = MINUTES_PATTERN.search(text)
+        if hours or minutes:
+            total = float(hours.group(1).replace(",", ".")) * 60 if hours else 0
+            if minutes:
+                total += int(minutes.group(1))
+            elif hours.group(2):
+                total += int(hours.group(2))
+            return int(round(total))
+
+        # A bare number or a range ("30-40"): take the upper bound
+        numbers = NUMBER_PATTERN.findall(text)
+        return int(numbers[-1]) if numbers else None
+
+    @staticmethod
+    def normalize_difficulty(value: Any) -> Optional[str]:
+        """Map a difficulty label to Fácil, Medio or Difícil, or None if unrecognized."""
+        if not isinstance(value, str):
+            return None
+        text = _strip_accents(value.strip().lower())
+        if text in DIFFICULTY_ALIASES:
+            return DIFFICULTY_ALIASES[text]
+        words = re.findall(r"[a-z]+", text)
+        if NEGATION_WORDS.intersection(words):
+            return None
+        # "Medio-alto", "muy fácil" etc.: first recognized word wins
+        for word in words:
+            if word in DIFFICULTY_ALIASES:
+                return DIFFICULTY_ALIASES[word]
+        return None
+
+    @staticmethod
+    def split_instructions(value: Any) -> List[str]:
+        """Turn an instruction blob or a list of mixed items into a list of step strings."""
+        if isinstance(value, str):
+            lines = [line for line in value.splitlines() if line.strip()]
+            if len(lines) <= 1:
+                lines = INLINE_STEP_PATTERN.split(value)
+            items = lines
+        elif isinstance(value, list):
+            items = value
+        else:
+            return []
+
+        steps = []
+        for item in items:
+            if isinstance(item, dict):
+                item = next((item[key] for key in STEP_TEXT_KEYS if isinstance(item.get(key), str)), None)
+            if not isinstance(item, str):
+                continue
+            step = STEP_PREFIX_PATTERN.sub("", item).strip()
+            if step:
+                steps.append(step)
+        return steps
+
+    @staticmethod
+    def normalize_ingredients(value: Any) -> List[Dict[str, Any]]:
+        """Turn ingredients into {"item", "quantity", "notes"} dicts, filling missing fields."""
+        if isinstance(value, str):
+            value = [line for line in re.split(r"[\n;]", value) if line.strip()]
+        if not isinstance(value, list):
+            return []
+
+        ingredients = []
+        for ingredient in value:
+            if isinstance(ingredient, str):
+                ingredient = {"item": STEP_PREFIX_PATTERN.sub("", ingredient).strip()}
+            if not isinstance(ingredient, dict) or not ingredient.get("item"):
+                continue
+            ingredient = dict(ingredient)
+            ingredient.setdefault("quantity", "")
+            if not isinstance(ingredient.get("notes"), str):
+                ingredient["notes"] = ""
+            ingredients.append(ingredient)
+        return ingredients
+
+    def repair(self, recipe: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Return a repaired copy of a recipe and the names of the fields that were fixed.
+
+        Fields that cannot be repaired are left as they are for validation to
+        report, except prep_time: an unparseable value is set to None
+        rather than sent back to the LLM.
+        """
+        repaired = copy.deepcopy(recipe)
+        fixed = []
+
+        prep_time = recipe.get("prep_time")
+        if not isinstance(prep_time, int) or isinstance(prep_time, bool) or prep_time < 0:
+            if prep_time is not None:
+                repaired["prep_time"] = self.parse_prep_time(prep_time)
+                fixed.append("prep_time")
+
+        difficulty = recipe.get("difficulty")
+        if difficulty not in ("Fácil", "Medio", "Difícil"):
+            normalized = self.normalize_difficulty(difficulty)
+            if normalized is None and not difficulty:
+                normalized = DEFAULT_DIFFICULTY
+            if normalized is not None:
+                repaired["difficulty"] = normalized
+                fixed.append("difficulty")
+
+        instructions = recipe.get("instructions")
+        if instructions and not (
+            isinstance(instructions, list) and all(isinstance(step, str) and step.strip() for step in instructions)
+        ):
+            steps = self.split_instructions(instructions)
+            if steps:
+                repaired["instructions"] = steps
+                fixed.append("instructions")
+
+        ingredients = recipe.get("ingredients")
+        if ingredients:
+            normalized_ingredients = self.normalize_ingredients(ingredients)
+            if normalized_ingredients and normalized_ingredients != ingredients:
+                repaired["ingredients"] = normalized_ingredients
+                fixed.append("ingredients")
+
+        return repaired, fixed
+
+    def record(self, fixed: List[str], refine_avoided: bool):
+        """Count one checked recipe, its repairs and whether they saved a refine."""
+        with self._lock:
+            self.checked += 1
+            if fixed:
+                self.repaired += 1
+            if refine_avoided:
+                self.refines_avoided += 1
+            for field in fixed:
+                self.repairs[field] = self.repairs.get(field, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return repair counters."""
+        with self._lock:
+            return {
+                "recipes_checked": self.checked,
+                "recipes_repaired": self.repaired,
+                "refines_avoided": self.refines_avoided,
+                "repairs_by_field": dict(self.repairs)
+            }
+
+
+recipe_repair_service = RecipeRepairService()
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception). Thread callers
+    use do() and asyncio callers use ado(); the two modes are tracked separately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) once per key across concurrent threads."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Await fn(*args) once per key across concurrent coroutines."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Shield so one cancelled waiter does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def in_flight(self) -> int:
+        """Number of keys currently being fetched."""
+        return len(self._calls) + len(self._tasks)
@@ -1,18 +1,55 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from ..models import OpenAIUsage
+from ..config import settings
+from ..models import OpenAIUsage, UsageRollup
 from ..database import SessionLocal
+from .budget_guard import budget_guard
+from .usage_writer import UsageEventWriter
 from ..utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Rollup periods and the SQLite strftime format of their bucket start
+ROLLUP_PERIODS = {
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+    "all": None
+}
+ALL_TIME_BUCKET = datetime(1970, 1, 1)
+ROLLUP_COUNTERS = (
+    "requests", "prompt_tokens", "completion_tokens", "total_tokens",
+    "cost_usd", "latency_ms_total", "latency_count"
+)
+
+
+def bucket_start(period: str, timestamp: datetime) -> datetime:
+    """Return the start of the rollup bucket containing timestamp."""
+    if period == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ALL_TIME_BUCKET
+
 
 class UsageTracker:
     """Track OpenAI API usage and costs."""
 
+    def __init__(self):
+        self._writer = UsageEventWriter(
+            self._write_batch,
+            batch_size=settings.usage_flush_batch_size,
+            interval_seconds=settings.usage_flush_interval_seconds,
+            max_attempts=settings.usage_flush_max_attempts,
+            backoff_seconds=settings.usage_flush_backoff_seconds
+        )
+
     PRICING = {
         "gpt-4o": {
             "input": 2.50 / 1_000_000,
+            "cached_input": 1.25 / 1_000_000,
             "output": 10.00 / 1_000_000
         },
         "gpt-image-1": {
@@ -28,34 +65,35 @@ class UsageTracker:
         prompt_tokens: int,
         completion_tokens: int,
         recipe_id: Optional[int] = None,
-        pokemon_id: Optional[int] = None
+        pokemon_id: Optional[int] = None,
+        request_type: str = "recipe_generation",
+        latency_ms: Optional[int] = None,
+        cached_prompt_tokens: int = 0
     ) -> float:
-        """Track LLM usage and return cost."""
+        """Track LLM usage (as reported by the model response) and return cost."""
         total_tokens = prompt_tokens + completion_tokens
 
-        input_cost = prompt_tokens * self.PRICING[model]["input"]
-        output_cost = completion_tokens * self.PRICING[model]["output"]
+        pricing = self.PRICING[model]
+        input_cost = (
+            (prompt_tokens - cached_prompt_tokens) * pricing["input"]
+            + cached_prompt_tokens * pricing.get("cached_input", pricing["input"])
+        )
+        output_cost = completion_tokens * pricing["output"]
         total_cost = input_cost + output_cost
 
-        db = SessionLocal()
-        try:
-            usage = OpenAIUsage(
-                request_type="recipe_generation",
-                model=model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                cost_usd=total_cost,
-                recipe_id=recipe_id,
-                pokemon_id=pokemon_id
-            )
-            db.add(usage)
-            db.commit()
-        except Exception as e:
-            logger.error(f"Error tracking LLM usage: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        budget_guard.record(total_cost)
+
+        self._store(OpenAIUsage(
+            request_type=request_type,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens,
+            cost_usd=total_cost,
+            latency_ms=latency_ms,
+            recipe_id=recipe_id,
+            pokemon_id=pokemon_id
+        ))
 
         return total_cost
 
@@ -63,32 +101,136 @@ class UsageTracker:
         self,
         quality: str,
         recipe_id: Optional[int] = None,
-        pokemon_id: Optional[int] = None
+        pokemon_id: Optional[int] = None,
+        latency_ms: Optional[int] = None
     ) -> float:
         """Track image generation usage and return cost."""
         cost = self.PRICING["gpt-image-1"].get(quality, 0.04)
+        budget_guard.record(cost)
+
+        self._store(OpenAIUsage(
+            request_type="image_generation",
+            model="gpt-image-1",
+            prompt_tokens=0,
+            completion_tokens=0,
+            total_tokens=0,
+            cost_usd=cost,
+            latency_ms=latency_ms,
+            recipe_id=recipe_id,
+            pokemon_id=pokemon_id
+        ))
 
+        return cost
+
+    def _store(self, usage: OpenAIUsage):
+        """Queue a usage record for the background writer."""
+        usage.created_at = datetime.utcnow()
+        self._writer.submit(usage)
+
+    def _write_batch(self, records: List[OpenAIUsage]):
+        """Insert usage records and update their rollups in one transaction."""
         db = SessionLocal()
         try:
-            usage = OpenAIUsage(
-                request_type="image_generation",
-                model="gpt-image-1",
-                prompt_tokens=0,
-                completion_tokens=0,
-                total_tokens=0,
-                cost_usd=cost,
-                recipe_id=recipe_id,
-                pokemon_id=pokemon_id
+            db.add_all(records)
+            self._add_to_rollups(db, records)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _add_to_rollups(self, db: Session, records: List[OpenAIUsage]):
+        """Increment the hour, day and all-time buckets of the records, one upsert per bucket."""
+        buckets: Dict[Tuple[str, datetime, str, str], Dict[str, float]] = {}
+        for usage in records:
+            for period in ROLLUP_PERIODS:
+                key = (period, bucket_start(period, usage.created_at), usage.model, usage.request_type)
+                totals = buckets.setdefault(key, dict.fromkeys(ROLLUP_COUNTERS, 0))
+                totals["requests"] += 1
+                totals["prompt_tokens"] += usage.prompt_tokens or 0
+                totals["completion_tokens"] += usage.completion_tokens or 0
+                totals["total_tokens"] += usage.total_tokens or 0
+                totals["cost_usd"] += usage.cost_usd or 0.0
+                if usage.latency_ms is not None:
+                    totals["latency_ms_total"] += usage.latency_ms
+                    totals["latency_count"] += 1
+
+        for (period, start, model, request_type), totals in buckets.items():
+            stmt = sqlite_insert(UsageRollup).values(
+                period=period,
+                bucket_start=start,
+                model=model,
+                request_type=request_type,
+                **totals
             )
-            db.add(usage)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["period", "bucket_start", "model", "request_type"],
+                set_={name: getattr(UsageRollup, name) + stmt.excluded[name] for name in ROLLUP_COUNTERS}
+            ))
+
+    def flush(self):
+        """Write buffered usage records now."""
+        self._writer.flush()
+
+    def close(self):
+        """Write buffered usage records and stop the background writer."""
+        self._writer.close()
+
+    def ensure_rollups(self):
+        """Rebuild the rollups from openai_usage if they are missing or out of sync."""
+        self.flush()
+        db = SessionLocal()
+        try:
+            recorded = db.query(func.count(OpenAIUsage.id)).scalar() or 0
+            rolled_up = db.query(func.sum(UsageRollup.requests)).filter(
+                UsageRollup.period == "all"
+            ).scalar() or 0
+            if recorded == rolled_up:
+                return
+
+            db.query(UsageRollup).delete()
+            for period, bucket_format in ROLLUP_PERIODS.items():
+                bucket = func.strftime(bucket_format, OpenAIUsage.created_at) if bucket_format else literal(None)
+                rows = db.query(
+                    bucket,
+                    OpenAIUsage.model,
+                    OpenAIUsage.request_type,
+                    func.count(OpenAIUsage.id),
+                    func.coalesce(func.sum(OpenAIUsage.prompt_tokens), 0),
+                    func.coalesce(func.sum(OpenAIUsage.completion_tokens), 0),
+                    func.coalesce(func.sum(OpenAIUsage.total_tokens), 0),
+                    func.coalesce(func.sum(OpenAIUsage.cost_usd), 0.0),
+                    func.coalesce(func.sum(OpenAIUsage.latency_ms), 0),
+                    func.count(OpenAIUsage.latency_ms)
+                ).group_by(bucket, OpenAIUsage.model, OpenAIUsage.request_type).all()
+
+                for start, model, request_type, *counters in rows:
+                    db.add(UsageRollup(
+                        period=period,
+                        bucket_start=datetime.fromisoformat(start) if start else ALL_TIME_BUCKET,
+                        model=model,
+                        request_type=request_type,
+                        **dict(zip(ROLLUP_COUNTERS, counters))
+                    ))
             db.commit()
+            logger.info(f"Rebuilt usage rollups from {recorded} usage records")
         except Exception as e:
-            logger.error(f"Error tracking image usage: {e}")
+            logger.error(f"Error rebuilding usage rollups: {e}")
             db.rollback()
         finally:
             db.close()
 
-        return cost
+    def get_total_cost(self) -> float:
+        """Return the total spend recorded so far, in USD (from the all-time rollups)."""
+        self.flush()
+        db = SessionLocal()
+        try:
+            return db.query(func.sum(UsageRollup.cost_usd)).filter(
+                UsageRollup.period == "all"
+            ).scalar() or 0.0
+        finally:
+            db.close()
 
 
 usage_tracker = UsageTracker()
@@ -0,0 +1,120 @@
+import atexit
+import threading
+import time
+from typing import Any, Callable, List, Optional
+from ..utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class UsageEventWriter:
+    """
+    Buffer usage events and write them in batches from a background thread.
+
+    A batch is written once batch_size events are pending or interval_seconds
+    have passed, whichever comes first. A batch that fails is retried with
+    exponential backoff and then put back at the front of the buffer for the
+    next flush, so billing records are not lost to transient errors such as
+    "database is locked". close() (also registered with atexit) writes
+    whatever is still buffered and only then drops what cannot be written;
+    events submitted after close are written synchronously.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Any]], None],
+        batch_size: int,
+        interval_seconds: float,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5
+    ):
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self._pending: List[Any] = []
+        self._cond = threading.Condition()
+        # Serializes batch writes so flush() returns only after in-flight writes land
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.requeued = 0
+        self.failed = 0
+
+    def submit(self, event: Any):
+        """Queue an event for the next batch."""
+        with self._cond:
+            if not self._closed:
+                self._pending.append(event)
+                self._ensure_thread()
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify()
+                return
+
+        if not self._write([event]):
+            self._drop([event])
+
+    def _ensure_thread(self):
+        """Start the writer thread on first use (condition held)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.interval_seconds)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _write(self, batch: List[Any]) -> bool:
+        """Write a batch, retrying with exponential backoff; returns whether it was written."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._write_batch(batch)
+                self.written += len(batch)
+                return True
+            except Exception as e:
+                logger.warning(f"Error writing {len(batch)} usage events (attempt {attempt}/{self.max_attempts}): {e}")
+                if attempt < self.max_attempts:
+                    time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return False
+
+    def _drop(self, batch: List[Any]):
+        self.failed += len(batch)
+        logger.error(f"Dropped {len(batch)} usage events that could not be written")
+
+    def flush(self):
+        """Write all pending events now; a batch that still fails goes back to the buffer."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch or self._write(batch):
+                return
+
+            with self._cond:
+                if not self._closed:
+                    # Keep submission order: the failed batch is older than anything queued since
+                    self._pending[:0] = batch
+                    self.requeued += len(batch)
+                    return
+            self._drop(batch)
+
+    def close(self):
+        """Stop the writer thread after writing every pending event."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+        self.flush()
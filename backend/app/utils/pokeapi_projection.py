@@ -0,0 +1,69 @@
+"""
+Compact projections of PokéAPI payloads.
+
+Only the fields read by PokeAPIService._build_attributes are kept, in the
+same nested shape as the original responses, so projected and raw payloads
+are interchangeable for readers. Projections are idempotent.
+"""
+from typing import Any, Dict, Optional
+
+SPECIES_CACHE_PREFIX = "species_"
+
+
+def _name_ref(obj: Any) -> Optional[Dict[str, Any]]:
+    """Reduce a {"name", "url"} reference to its name."""
+    if isinstance(obj, dict) and obj.get("name"):
+        return {"name": obj["name"]}
+    return None
+
+
+def project_pokemon(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a /pokemon response to id, name, types, size and artwork."""
+    types = []
+    for t in data.get("types") or []:
+        type_ref = _name_ref(t.get("type")) if isinstance(t, dict) else None
+        if type_ref:
+            types.append({"type": type_ref})
+
+    artwork = ""
+    sprites = data.get("sprites")
+    if isinstance(sprites, dict) and isinstance(sprites.get("other"), dict):
+        official = sprites["other"].get("official-artwork")
+        if isinstance(official, dict):
+            artwork = official.get("front_default") or ""
+
+    return {
+        "id": data.get("id"),
+        "name": data.get("name"),
+        "types": types,
+        "height": data.get("height", 0),
+        "weight": data.get("weight", 0),
+        "sprites": {"other": {"official-artwork": {"front_default": artwork}}}
+    }
+
+
+def project_species(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a /pokemon-species response to color, habitat and one English flavor text."""
+    flavor_text_entries = []
+    for entry in data.get("flavor_text_entries") or []:
+        if not isinstance(entry, dict):
+            continue
+        language = entry.get("language")
+        if isinstance(language, dict) and language.get("name") == "en" and entry.get("flavor_text"):
+            flavor_text_entries.append({"flavor_text": entry["flavor_text"], "language": {"name": "en"}})
+            break
+
+    return {
+        "id": data.get("id"),
+        "name": data.get("name"),
+        "color": _name_ref(data.get("color")),
+        "habitat": _name_ref(data.get("habitat")),
+        "flavor_text_entries": flavor_text_entries
+    }
+
+
+def project_cache_entry(cache_key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a payload according to its pokemon_cache key."""
+    if cache_key.startswith(SPECIES_CACHE_PREFIX):
+        return project_species(data)
+    return project_pokemon(data)
@@ -0,0 +1,181 @@
+"""
+Bulk warm-up of the Pokemon cache.
+
+Prefetches Pokemon and species data for a range of IDs so cold starts do
+not hit PokéAPI, or imports/exports a JSON-lines snapshot for offline use.
+
+Usage:
+    python -m app.warm_cache                          # IDs 1-1017 from PokéAPI
+    python -m app.warm_cache --start 1 --end 151 --concurrency 8
+    python -m app.warm_cache --snapshot pokedex.jsonl # offline import
+    python -m app.warm_cache --export pokedex.jsonl   # write a snapshot
+
+Snapshot lines look like {"id": 25, "pokemon": {...}, "species": {...}}.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+from .database import init_db, SessionLocal
+from .models import PokemonCache
+from .services.pokeapi import pokeapi_service
+from .utils.pokeapi_projection import SPECIES_CACHE_PREFIX
+from .utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MAX_POKEMON_ID = 1017
+PROGRESS_EVERY = 50
+SNAPSHOT_BATCH_SIZE = 200
+
+
+def cache_keys_for(pokemon_id: int) -> List[str]:
+    """Cache keys holding the data for one Pokemon."""
+    return [str(pokemon_id), f"{SPECIES_CACHE_PREFIX}{pokemon_id}"]
+
+
+def pending_ids(pokemon_ids: List[int]) -> List[int]:
+    """Return the IDs whose pokemon or species entry is missing or expired."""
+    keys = [key for pokemon_id in pokemon_ids for key in cache_keys_for(pokemon_id)]
+    fresh = set()
+    for i in range(0, len(keys), SNAPSHOT_BATCH_SIZE):
+        fresh |= pokeapi_service.get_fresh_cache_keys(keys[i:i + SNAPSHOT_BATCH_SIZE])
+    return [
+        pokemon_id for pokemon_id in pokemon_ids
+        if not all(key in fresh for key in cache_keys_for(pokemon_id))
+    ]
+
+
+async def warm_from_api(pokemon_ids: List[int], concurrency: int) -> Dict[str, int]:
+    """Fetch and cache every pending ID with bounded concurrency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"total": len(pokemon_ids), "done": 0, "failed": 0}
+    started = time.monotonic()
+
+    async def warm_one(pokemon_id: int):
+        async with semaphore:
+            pokemon_data, _ = await asyncio.gather(
+                pokeapi_service.aget_pokemon(pokemon_id),
+                pokeapi_service.aget_pokemon_species(pokemon_id)
+            )
+        stats["done"] += 1
+        if not pokemon_data:
+            stats["failed"] += 1
+        if stats["done"] % PROGRESS_EVERY == 0 or stats["done"] == stats["total"]:
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Warmed {stats['done']}/{stats['total']} Pokemon "
+                f"({stats['failed']} failed, {elapsed:.1f}s)"
+            )
+
+    try:
+        await asyncio.gather(*(warm_one(pokemon_id) for pokemon_id in pokemon_ids))
+    finally:
+        await pokeapi_service.aclose()
+    return stats
+
+
+def import_snapshot(path: str) -> int:
+    """Load a JSON-lines snapshot into the cache without any network access."""
+    imported = 0
+    batch: Dict[str, Dict[str, Any]] = {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid snapshot line {line_number}: {e}")
+                continue
+
+            pokemon = record.get("pokemon")
+            pokemon_id = record.get("id") or (pokemon or {}).get("id")
+            if not pokemon or not pokemon_id:
+                logger.warning(f"Skipping snapshot line {line_number}: missing pokemon data")
+                continue
+
+            pokemon_key, species_key = cache_keys_for(pokemon_id)
+            batch[pokemon_key] = pokemon
+            if record.get("species"):
+                batch[species_key] = record["species"]
+
+            if len(batch) >= SNAPSHOT_BATCH_SIZE:
+                imported += pokeapi_service.bulk_save_to_cache(batch)
+                batch = {}
+                logger.info(f"Imported {imported} cache entries")
+
+    if batch:
+        imported += pokeapi_service.bulk_save_to_cache(batch)
+    return imported
+
+
+def export_snapshot(path: str, pokemon_ids: List[int]) -> int:
+    """Write cached entries for the given IDs as a JSON-lines snapshot."""
+    db = SessionLocal()
+    exported = 0
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(0, len(pokemon_ids), SNAPSHOT_BATCH_SIZE):
+                chunk = pokemon_ids[i:i + SNAPSHOT_BATCH_SIZE]
+                keys = [key for pokemon_id in chunk for key in cache_keys_for(pokemon_id)]
+                rows = db.query(PokemonCache).filter(PokemonCache.name.in_(keys)).all()
+                cached = {row.name: json.loads(row.data) for row in rows}
+
+                for pokemon_id in chunk:
+                    pokemon_key, species_key = cache_keys_for(pokemon_id)
+                    if pokemon_key not in cached:
+                        continue
+                    record = {
+                        "id": pokemon_id,
+                        "pokemon": cached[pokemon_key],
+                        "species": cached.get(species_key)
+                    }
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    exported += 1
+    finally:
+        db.close()
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the Pokemon cache for the full Pokédex.")
+    parser.add_argument("--start", type=int, default=1, help="First Pokemon ID (default: 1)")
+    parser.add_argument("--end", type=int, default=MAX_POKEMON_ID, help=f"Last Pokemon ID (default: {MAX_POKEMON_ID})")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel Pokemon fetches (default: 16)")
+    parser.add_argument("--snapshot", help="Import a JSON-lines snapshot instead of calling PokéAPI")
+    parser.add_argument("--export", help="Export cached entries to a JSON-lines snapshot")
+    args = parser.parse_args()
+
+    init_db()
+    pokemon_ids = list(range(args.start, args.end + 1))
+
+    if args.snapshot:
+        imported = import_snapshot(args.snapshot)
+        logger.info(f"🎉 Imported {imported} cache entries from {args.snapshot}")
+        return
+
+    if args.export:
+        exported = export_snapshot(args.export, pokemon_ids)
+        logger.info(f"🎉 Exported {exported} Pokemon to {args.export}")
+        return
+
+    # Resume: only fetch IDs that are not already cached
+    pokemon_ids = pending_ids(pokemon_ids)
+    skipped = args.end - args.start + 1 - len(pokemon_ids)
+    if skipped:
+        logger.info(f"Resuming: {skipped} Pokemon already cached, {len(pokemon_ids)} pending")
+
+    if not pokemon_ids:
+        logger.info("Cache already warm, nothing to do")
+        return
+
+    stats = asyncio.run(warm_from_api(pokemon_ids, max(1, args.concurrency)))
+    logger.info(f"🎉 Cache warm-up finished: {stats['done'] - stats['failed']} cached, {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,15 @@
-from .recipe_graph import generate_recipe_workflow
+from .recipe_graph import (
+    generate_recipe_workflow,
+    stream_recipe_workflow,
+    open_workflow_checkpoints,
+    close_workflow_checkpoints,
+    RunMismatchError
+)
 
-__all__ = ["generate_recipe_workflow"]
+__all__ = [
+    "generate_recipe_workflow",
+    "stream_recipe_workflow",
+    "open_workflow_checkpoints",
+    "close_workflow_checkpoints",
+    "RunMismatchError"
+]
@@ -1,9 +1,15 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
 from .state import RecipeState
 from ..services.pokeapi import pokeapi_service
 from ..services.llm_service import llm_service
 from ..services.image_service import image_service
+from ..services.blob_store import image_blob_store
+from ..services.image_variants import image_variants
+from ..services.image_jobs import image_job_queue
+from ..services.recipe_repair import recipe_repair_service
 from ..models import Recipe
 from ..database import SessionLocal
 from ..utils.logger import setup_logger
@@ -11,12 +17,12 @@ from ..utils.logger import setup_logger
 logger = setup_logger(__name__)
 
 
-def fetch_pokemon_node(state: RecipeState) -> RecipeState:
+async def fetch_pokemon_node(state: RecipeState) -> RecipeState:
     """Fetch Pokemon data from PokéAPI."""
     pokemon_id = state["pokemon_id"]
     
     try:
-        pokemon_data = pokeapi_service.extract_attributes(pokemon_id)
+        pokemon_data = await pokeapi_service.aextract_attributes(pokemon_id)
         
         if not pokemon_data:
             state["errors"].append(f"Pokemon with ID {pokemon_id} not found")
@@ -47,8 +53,13 @@ def build_prompt_node(state: RecipeState) -> RecipeState:
     return state
 
 
-def generate_recipe_node(state: RecipeState) -> RecipeState:
-    """Generate recipe using LLM."""
+async def generate_recipe_node(state: RecipeState, config: RunnableConfig) -> RecipeState:
+    """
+    Generate recipe using LLM.
+
+    Partial recipes are streamed only when the run asks for them with the
+    stream_partial_recipes config flag; other runs use a single ainvoke.
+    """
     pokemon_data = state.get("pokemon_data") or {}
     preferences = state.get("user_preferences") or {}
 
@@ -57,7 +68,11 @@ def generate_recipe_node(state: RecipeState) -> RecipeState:
         return state
 
     try:
-        recipe_data = llm_service.generate_recipe(pokemon_data, preferences)
+        on_partial = None
+        if config.get("configurable", {}).get("stream_partial_recipes"):
+            writer = get_stream_writer()
+            on_partial = lambda partial: writer({"event": "recipe_partial", "recipe": partial})
+        recipe_data = await llm_service.agenerate_recipe(pokemon_data, preferences, on_partial=on_partial)
         state["raw_recipe"] = recipe_data
 
         if "error" in recipe_data:
@@ -70,81 +85,156 @@ def generate_recipe_node(state: RecipeState) -> RecipeState:
     return state
 
 
-def validate_recipe_node(state: RecipeState) -> RecipeState:
-    """Validate the generated recipe."""
-    raw_recipe = state.get("raw_recipe", {})
-    
-    if not raw_recipe:
-        state["errors"].append("No recipe to validate")
-        return state
-    
+def _structure_error(recipe: Dict[str, Any]) -> Optional[str]:
+    """Return why a recipe lacks required content, or None if it has it."""
     # Basic validation
     required_fields = ["title", "description", "ingredients", "instructions"]
-    missing_fields = [field for field in required_fields if field not in raw_recipe or not raw_recipe[field]]
+    missing_fields = [field for field in required_fields if field not in recipe or not recipe[field]]
     
     if missing_fields:
-        state["errors"].append(f"Recipe missing required fields: {', '.join(missing_fields)}")
-        return state
+        return f"Recipe missing required fields: {', '.join(missing_fields)}"
     
     # Validate ingredients format
-    ingredients = raw_recipe.get("ingredients", [])
+    ingredients = recipe.get("ingredients", [])
     if not isinstance(ingredients, list) or len(ingredients) == 0:
-        state["errors"].append("Recipe must have at least one ingredient")
-        return state
+        return "Recipe must have at least one ingredient"
     
     # Validate instructions format
-    instructions = raw_recipe.get("instructions", [])
+    instructions = recipe.get("instructions", [])
     if not isinstance(instructions, list) or len(instructions) == 0:
-        state["errors"].append("Recipe must have at least one instruction")
+        return "Recipe must have at least one instruction"
+
+    return None
+
+
+def _validation_error(recipe: Dict[str, Any]) -> Optional[str]:
+    """Return why a recipe is invalid, or None if it can be saved."""
+    error = _structure_error(recipe)
+    if error:
+        return error
+
+    # prep_time is stored as an integer number of minutes
+    prep_time = recipe.get("prep_time")
+    if prep_time is not None and (not isinstance(prep_time, int) or isinstance(prep_time, bool)):
+        return "Recipe prep_time must be a whole number of minutes"
+    
+    return None
+
+
+def repair_recipe_node(state: RecipeState) -> RecipeState:
+    """
+    Fix common schema problems locally before validation.
+
+    A recipe that only fails validation because of its shape (e.g. prep_time
+    as text, instructions as one string) is repaired here instead of being
+    sent back to the LLM by refine_recipe_node.
+    """
+    raw_recipe = state.get("raw_recipe")
+
+    if not raw_recipe or "error" in raw_recipe:
+        return state
+
+    repaired, fixed = recipe_repair_service.repair(raw_recipe)
+    # Judge the original by the checks that existed before repairs, so only
+    # refines that would actually have been made are counted
+    refine_avoided = _structure_error(raw_recipe) is not None and _validation_error(repaired) is None
+    recipe_repair_service.record(fixed, refine_avoided)
+
+    if fixed:
+        logger.info(f"Repaired recipe fields locally: {', '.join(fixed)}")
+        state["raw_recipe"] = repaired
+
+    return state
+
+
+def validate_recipe_node(state: RecipeState) -> RecipeState:
+    """Validate the generated recipe."""
+    raw_recipe = state.get("raw_recipe", {})
+    
+    if not raw_recipe:
+        state["errors"].append("No recipe to validate")
+        return state
+    
+    error = _validation_error(raw_recipe)
+    if error:
+        state["errors"].append(error)
         return state
     
     # If validation passes, mark as validated
     state["validated_recipe"] = raw_recipe
+
+    # Only validated recipes are reused by the response cache
+    llm_service.remember_recipe(state.get("pokemon_data") or {}, state.get("user_preferences"), raw_recipe)
     
     return state
 
 
+def prepare_recipe_node(state: RecipeState) -> Dict[str, Any]:
+    """
+    Build the recipes row for the validated recipe.
+
+    Runs in parallel with generate_image_node, so it returns only the keys it
+    sets rather than the whole state.
+    """
+    validated_recipe = state.get("validated_recipe") or {}
+    pokemon_data = state.get("pokemon_data") or {}
+
+    return {
+        "recipe_record": {
+            "pokemon_id": pokemon_data.get("id"),
+            "pokemon_name": pokemon_data.get("name"),
+            "recipe_title": validated_recipe.get("title"),
+            "description": validated_recipe.get("description"),
+            "ingredients": json.dumps(validated_recipe.get("ingredients", [])),
+            "instructions": json.dumps(validated_recipe.get("instructions", [])),
+            "difficulty": validated_recipe.get("difficulty", "Medium"),
+            "prep_time": validated_recipe.get("prep_time", 0),
+            "thematic_connection": validated_recipe.get("thematic_connection", ""),
+            "presentation": validated_recipe.get("presentation", "")
+        }
+    }
+
+
 def save_recipe_node(state: RecipeState) -> RecipeState:
-    """Save recipe to database."""
-    validated_recipe = state.get("validated_recipe", {})
-    pokemon_data = state.get("pokemon_data", {})
-    
-    if not validated_recipe or not pokemon_data:
+    """
+    Save the recipe, with its image if one was generated, in a single write.
+
+    Joins the prepare_recipe and generate_image_node branches. If the image
+    was requested but failed, a background image job is queued for the saved
+    recipe. A database error is raised rather than recorded, so a
+    checkpointed run can resume at this node.
+    """
+    recipe_record = state.get("recipe_record")
+
+    if not recipe_record or not recipe_record.get("pokemon_id"):
         state["errors"].append("Cannot save recipe: missing data")
         return state
-    
+
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        
-        recipe = Recipe(
-            pokemon_id=pokemon_data.get("id"),
-            pokemon_name=pokemon_data.get("name"),
-            recipe_title=validated_recipe.get("title"),
-            description=validated_recipe.get("description"),
-            ingredients=json.dumps(validated_recipe.get("ingredients", [])),
-            instructions=json.dumps(validated_recipe.get("instructions", [])),
-            difficulty=validated_recipe.get("difficulty", "Medium"),
-            prep_time=validated_recipe.get("prep_time", 0),
-            thematic_connection=validated_recipe.get("thematic_connection", ""),
-            presentation=validated_recipe.get("presentation", "")
-        )
-        
+        recipe = Recipe(**recipe_record, image_url=state.get("image_url"))
         db.add(recipe)
         db.commit()
         db.refresh(recipe)
-        
         state["recipe_id"] = recipe.id
-        
-        db.close()
-        
     except Exception as e:
         logger.error(f"Error in save_recipe_node: {e}")
-        state["errors"].append(f"Error saving recipe: {str(e)}")
-    
+        db.close()
+        raise
+
+    try:
+        if state.get("generate_image") and not state.get("image_url"):
+            state["image_job_id"] = image_job_queue.submit(db, recipe.id).id
+    except Exception as e:
+        # Not fatal: the image can still be requested later for the saved recipe
+        logger.warning(f"Could not queue image job for recipe {recipe.id}: {e}")
+    finally:
+        db.close()
+
     return state
 
 
-def refine_recipe_node(state: RecipeState) -> RecipeState:
+async def refine_recipe_node(state: RecipeState) -> RecipeState:
     """Refine an incomplete recipe based on validation errors."""
     pokemon_data = state.get("pokemon_data", {})
     raw_recipe = state.get("raw_recipe", {})
@@ -156,7 +246,7 @@ def refine_recipe_node(state: RecipeState) -> RecipeState:
 
     try:
         state["refinement_count"] += 1
-        refined_recipe = llm_service.refine_recipe(
+        refined_recipe = await llm_service.arefine_recipe(
             incomplete_recipe=raw_recipe,
             pokemon_data=pokemon_data,
             errors=errors,
@@ -176,43 +266,31 @@ def refine_recipe_node(state: RecipeState) -> RecipeState:
     return state
 
 
-def generate_image_node(state: RecipeState) -> RecipeState:
-    """Generate image for the recipe."""
-    validated_recipe = state.get("validated_recipe", {})
-    pokemon_data = state.get("pokemon_data", {})
-    recipe_id = state.get("recipe_id")
+def generate_image_node(state: RecipeState) -> Dict[str, Any]:
+    """
+    Generate and store the image for the recipe.
 
-    if not validated_recipe or not pokemon_data:
-        state["errors"].append("Cannot generate image: missing data")
-        return state
+    Runs in parallel with prepare_recipe, so it returns only the keys it sets.
+    Usage is recorded as soon as the image is paid for; the recipe ID is not
+    known yet. A failure leaves image_url unset: the recipe is still saved and
+    save_recipe_node queues a background image job for it.
+    """
+    validated_recipe = state.get("validated_recipe") or {}
+    pokemon_data = state.get("pokemon_data") or {}
 
     try:
         image_prompt = llm_service.generate_image_prompt(validated_recipe, pokemon_data)
-        state["image_prompt"] = image_prompt
-
-        image_b64 = image_service.generate_image(
-            image_prompt,
-            recipe_id=recipe_id,
-            pokemon_id=pokemon_data.get("id")
-        )
+        image_b64 = image_service.generate_image(image_prompt, pokemon_id=pokemon_data.get("id"))
 
-        if image_b64:
-            # Store base64 data that can be used as a data URL
-            state["image_url"] = f"data:image/png;base64,{image_b64}"
-
-            # Update recipe in database with base64 data URL
-            if recipe_id:
-                db = SessionLocal()
-                recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
-                if recipe:
-                    recipe.image_url = f"data:image/png;base64,{image_b64}"
-                    db.commit()
-                db.close()
-        else:
-            state["errors"].append("Failed to generate image")
+        if not image_b64:
+            logger.warning("Failed to generate image; saving the recipe without one")
+            return {"image_prompt": image_prompt}
 
+        # Store the image in the blob store; the recipe keeps only its short URL
+        digest = image_blob_store.put_base64(image_b64)
+        image_variants.submit(digest)
     except Exception as e:
         logger.error(f"Error in generate_image_node: {e}")
-        state["errors"].append(f"Error generating image: {str(e)}")
+        return {}
 
-    return state
+    return {"image_prompt": image_prompt, "image_url": image_blob_store.url_for(digest)}
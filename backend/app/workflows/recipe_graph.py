@@ -1,17 +1,28 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import StateGraph, END
+from ..config import settings
+from ..utils.logger import setup_logger
 from .state import RecipeState
 from .nodes import (
     fetch_pokemon_node,
     build_prompt_node,
     generate_recipe_node,
+    repair_recipe_node,
     validate_recipe_node,
     refine_recipe_node,
+    prepare_recipe_node,
     save_recipe_node,
     generate_image_node
 )
 
+logger = setup_logger(__name__)
 
-def create_recipe_workflow():
+
+def create_recipe_workflow(checkpointer: Optional[AsyncSqliteSaver] = None):
     """Create and compile the recipe generation workflow."""
     
     # Create the state graph
@@ -21,8 +32,10 @@ def create_recipe_workflow():
     workflow.add_node("fetch_pokemon", fetch_pokemon_node)
     workflow.add_node("build_prompt", build_prompt_node)
     workflow.add_node("generate_recipe", generate_recipe_node)
+    workflow.add_node("repair_recipe", repair_recipe_node)
     workflow.add_node("validate_recipe", validate_recipe_node)
     workflow.add_node("refine_recipe", refine_recipe_node)
+    workflow.add_node("prepare_recipe", prepare_recipe_node)
     workflow.add_node("save_recipe", save_recipe_node)
     workflow.add_node("generate_image_node", generate_image_node)
     
@@ -32,15 +45,24 @@ def create_recipe_workflow():
     # Sequential flow for main recipe generation
     workflow.add_edge("fetch_pokemon", "build_prompt")
     workflow.add_edge("build_prompt", "generate_recipe")
-    workflow.add_edge("generate_recipe", "validate_recipe")
+    # Local schema repairs run before every validation, saving LLM refines
+    workflow.add_edge("generate_recipe", "repair_recipe")
+    workflow.add_edge("repair_recipe", "validate_recipe")
     
     # Conditional edge after validation
-    def should_continue(state: RecipeState) -> str:
-        """Determine next step: save valid recipe, refine invalid, or end if can't fix."""
+    def should_continue(state: RecipeState) -> Union[str, List[str]]:
+        """
+        Determine next step: save valid recipe, refine invalid, or end if can't fix.
+
+        A valid recipe that needs an image fans out to prepare_recipe and
+        generate_image_node, which run in parallel.
+        """
         errors = state.get("errors", [])
         refinement_count = state.get("refinement_count", 0)
 
         if not errors:
+            if state.get("generate_image", False):
+                return ["save", "image"]
             return "save"
         elif refinement_count < 2:
             return "refine"
@@ -51,74 +73,224 @@ def create_recipe_workflow():
         "validate_recipe",
         should_continue,
         {
-            "save": "save_recipe",
+            "save": "prepare_recipe",
+            "image": "generate_image_node",
             "refine": "refine_recipe",
             "end": END
         }
     )
 
-    # Edge from refine back to validate
-    workflow.add_edge("refine_recipe", "validate_recipe")
+    # Edge from refine back to validate (through the local repairs)
+    workflow.add_edge("refine_recipe", "repair_recipe")
     
-    # Conditional edge for image generation
-    def should_generate_image(state: RecipeState) -> str:
-        """Determine if image should be generated."""
-        if state.get("generate_image", False) and not state.get("errors"):
-            return "image"
-        return "end"
-
-    workflow.add_conditional_edges(
-        "save_recipe",
-        should_generate_image,
-        {
-            "image": "generate_image_node",
-            "end": END
-        }
-    )
-
-    workflow.add_edge("generate_image_node", END)
+    # Both branches are one step long, so save_recipe runs once after they finish
+    workflow.add_edge("prepare_recipe", "save_recipe")
+    workflow.add_edge("generate_image_node", "save_recipe")
+    workflow.add_edge("save_recipe", END)
     
     # Compile the graph
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 
-# Create global workflow instance
+# Create global workflow instance (checkpointed once open_workflow_checkpoints has run)
 recipe_workflow = create_recipe_workflow()
+_checkpointer: Optional[AsyncSqliteSaver] = None
 
 
-async def generate_recipe_workflow(
+async def open_workflow_checkpoints(path: str = None):
+    """
+    Persist workflow checkpoints in a local SQLite database.
+
+    Each run is checkpointed after every node under its run ID, so a run that
+    raised (e.g. an image or save failure) can be resumed from the last
+    completed node instead of starting over. Runs that are never resumed are
+    dropped after workflow_checkpoint_ttl_hours.
+    """
+    global recipe_workflow, _checkpointer
+    path = path or settings.workflow_checkpoint_path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    _checkpointer = AsyncSqliteSaver(await aiosqlite.connect(path))
+    await _checkpointer.setup()
+    recipe_workflow = create_recipe_workflow(_checkpointer)
+    await prune_workflow_checkpoints()
+
+
+async def prune_workflow_checkpoints(ttl_hours: float = None) -> int:
+    """Delete runs whose latest checkpoint is older than the TTL; returns how many were deleted."""
+    if _checkpointer is None:
+        return 0
+    ttl_hours = settings.workflow_checkpoint_ttl_hours if ttl_hours is None else ttl_hours
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=ttl_hours)
+
+    # Only interrupted runs keep checkpoints, so this scan stays small
+    latest: Dict[str, datetime] = {}
+    async for checkpoint in _checkpointer.alist(None):
+        thread_id = checkpoint.config["configurable"]["thread_id"]
+        ts = datetime.fromisoformat(checkpoint.checkpoint["ts"])
+        if thread_id not in latest or ts > latest[thread_id]:
+            latest[thread_id] = ts
+
+    expired = [thread_id for thread_id, ts in latest.items() if ts < cutoff]
+    for thread_id in expired:
+        await _checkpointer.adelete_thread(thread_id)
+    if expired:
+        logger.info(f"Deleted checkpoints of {len(expired)} workflow runs older than {ttl_hours:g}h")
+    return len(expired)
+
+
+async def close_workflow_checkpoints():
+    """Close the checkpoint database; later runs are not checkpointed."""
+    global recipe_workflow, _checkpointer
+    if _checkpointer is not None:
+        await _checkpointer.conn.close()
+        _checkpointer = None
+        recipe_workflow = create_recipe_workflow()
+
+
+def _initial_state(
     pokemon_id: int,
     preferences: dict = None,
-    generate_image: bool = False
+    generate_image: bool = False,
+    run_id: Optional[str] = None
 ) -> RecipeState:
-    """
-    Execute the recipe generation workflow.
-    
-    Args:
-        pokemon_id: ID of the Pokemon
-        preferences: User preferences (optional)
-        generate_image: Whether to generate an image
-        
-    Returns:
-        Final state with recipe data or errors
-    """
-    initial_state: RecipeState = {
+    """Build the initial workflow state."""
+    return {
         "pokemon_id": pokemon_id,
         "pokemon_name": None,
         "pokemon_data": None,
         "user_preferences": preferences,
         "generate_image": generate_image,
+        "run_id": run_id,
         "recipe_prompt": None,
         "raw_recipe": None,
         "validated_recipe": None,
         "refinement_count": 0,
+        "recipe_record": None,
         "recipe_id": None,
         "image_url": None,
+        "image_job_id": None,
         "image_prompt": None,
         "errors": []
     }
+
+
+class RunMismatchError(ValueError):
+    """Raised when a run ID is resumed with different inputs than it was started with."""
+
+
+async def _start_or_resume(
+    pokemon_id: int,
+    preferences: dict,
+    generate_image: bool,
+    run_id: Optional[str]
+) -> Tuple[Optional[RecipeState], Optional[Dict[str, Any]]]:
+    """
+    Return the workflow input and config for a run.
+
+    The input is None when run_id has an interrupted checkpoint to resume;
+    the config is None when the run is not checkpointed.
+    """
+    if _checkpointer is None or not run_id:
+        return _initial_state(pokemon_id, preferences, generate_image, run_id), None
+
+    config = {"configurable": {"thread_id": run_id}}
+    snapshot = await recipe_workflow.aget_state(config)
+
+    if snapshot.next:
+        started = snapshot.values
+        if started.get("pokemon_id") != pokemon_id:
+            raise RunMismatchError(
+                f"Run {run_id} was started for Pokemon {started.get('pokemon_id')}"
+            )
+        # None and {} both mean "no preferences"
+        if (started.get("user_preferences") or None) != (preferences or None):
+            raise RunMismatchError(f"Run {run_id} was started with different preferences")
+        if bool(started.get("generate_image")) != bool(generate_image):
+            raise RunMismatchError(
+                f"Run {run_id} was started with generate_image={bool(started.get('generate_image'))}"
+            )
+        logger.info(f"Resuming workflow run {run_id} at {', '.join(snapshot.next)}")
+        return None, config
+
+    return _initial_state(pokemon_id, preferences, generate_image, run_id), config
+
+
+def _durability(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Write each checkpoint before the next step runs, so a failure never loses a finished step."""
+    # Only valid with a checkpointer; LangGraph fails on it otherwise
+    return "sync" if config is not None else None
+
+
+async def _finish_run(config: Optional[Dict[str, Any]]):
+    """Drop the checkpoints of a run that completed; only interrupted runs are kept."""
+    if config is not None:
+        await _checkpointer.adelete_thread(config["configurable"]["thread_id"])
+
+
+async def generate_recipe_workflow(
+    pokemon_id: int,
+    preferences: dict = None,
+    generate_image: bool = False,
+    run_id: Optional[str] = None
+) -> RecipeState:
+    """
+    Execute the recipe generation workflow.
+    
+    Args:
+        pokemon_id: ID of the Pokemon
+        preferences: User preferences (optional)
+        generate_image: Whether to generate an image
+        run_id: Checkpoint key; a run that raised resumes when called again with it
+        
+    Returns:
+        Final state with recipe data or errors
+    """
+    workflow_input, config = await _start_or_resume(pokemon_id, preferences, generate_image, run_id)
     
     # Execute the workflow
-    result = await recipe_workflow.ainvoke(initial_state)
+    result = await recipe_workflow.ainvoke(workflow_input, config, durability=_durability(config))
+    await _finish_run(config)
     
     return result
+
+
+async def stream_recipe_workflow(
+    pokemon_id: int,
+    preferences: dict = None,
+    generate_image: bool = False,
+    run_id: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Execute the recipe generation workflow, yielding progress as it happens.
+
+    Yields:
+        ("stage", {"stage": node_name}) after each node completes,
+        ("recipe_partial", {"recipe": partial}) while the LLM streams, and
+        finally ("final", state) with the final workflow state.
+    """
+    workflow_input, config = await _start_or_resume(pokemon_id, preferences, generate_image, run_id)
+    final_state = workflow_input
+    # generate_recipe_node streams the LLM response only when asked to
+    stream_config = config or {}
+    stream_config = {
+        **stream_config,
+        "configurable": {**stream_config.get("configurable", {}), "stream_partial_recipes": True}
+    }
+
+    async for mode, chunk in recipe_workflow.astream(
+        workflow_input,
+        stream_config,
+        stream_mode=["updates", "custom", "values"],
+        durability=_durability(config)
+    ):
+        if mode == "updates":
+            for node_name in chunk:
+                yield "stage", {"stage": node_name}
+        elif mode == "custom" and chunk.get("event") == "recipe_partial":
+            yield "recipe_partial", {"recipe": chunk["recipe"]}
+        elif mode == "values":
+            final_state = chunk
+
+    await _finish_run(config)
+    yield "final", final_state
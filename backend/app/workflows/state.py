@@ -10,15 +10,18 @@ class RecipeState(TypedDict):
     pokemon_data: Optional[Dict[str, Any]]
     user_preferences: Optional[Dict[str, Any]]
     generate_image: bool
+    run_id: Optional[str]  # Checkpoint thread ID
     
     # Processing
     recipe_prompt: Optional[str]
     raw_recipe: Optional[Dict[str, Any]]
     validated_recipe: Optional[Dict[str, Any]]
     refinement_count: int
+    recipe_record: Optional[Dict[str, Any]]  # recipes row, written by save_recipe
     
     # Output
     recipe_id: Optional[int]
     image_url: Optional[str]
+    image_job_id: Optional[int]  # queued when the requested image failed
     image_prompt: Optional[str]
     errors: List[str]
@@ -1,4 +1,6 @@
+import json
 import sqlite3
+from app.utils.pokeapi_projection import project_cache_entry
 
 # Connect to the database
 conn = sqlite3.connect('/app/recipes.db')
@@ -26,9 +28,53 @@ except sqlite3.OperationalError as e:
     else:
         print(f"❌ Error: {e}")
 
+try:
+    # Add latency_ms column to usage records
+    cursor.execute("ALTER TABLE openai_usage ADD COLUMN latency_ms INTEGER")
+    print("✅ Columna 'latency_ms' agregada")
+except sqlite3.OperationalError as e:
+    if "duplicate column name" in str(e):
+        print("⚠️  Columna 'latency_ms' ya existe")
+    else:
+        print(f"❌ Error: {e}")
+
+# Covering indexes for keyset pagination of the recipe list (replace the key-only ones)
+summary_columns = "pokemon_name, recipe_title, description, difficulty, prep_time, image_url"
+cursor.execute("DROP INDEX IF EXISTS ix_recipes_created_at_id")
+cursor.execute("DROP INDEX IF EXISTS ix_recipes_pokemon_id_created_at_id")
+cursor.execute(
+    "CREATE INDEX IF NOT EXISTS ix_recipes_summary_created_at_id "
+    f"ON recipes (created_at, id, pokemon_id, {summary_columns})"
+)
+cursor.execute(
+    "CREATE INDEX IF NOT EXISTS ix_recipes_summary_pokemon_id_created_at_id "
+    f"ON recipes (pokemon_id, created_at, id, {summary_columns})"
+)
+print("✅ Índices de paginación de 'recipes' creados")
+
+# Compact cached PokéAPI payloads down to the fields the app reads
+try:
+    cursor.execute("SELECT id, name, data FROM pokemon_cache")
+    compacted = 0
+    for row_id, name, data in cursor.fetchall():
+        try:
+            compact = json.dumps(project_cache_entry(name, json.loads(data)), separators=(",", ":"))
+        except (ValueError, TypeError, AttributeError):
+            cursor.execute("DELETE FROM pokemon_cache WHERE id = ?", (row_id,))
+            continue
+        if len(compact) < len(data):
+            cursor.execute("UPDATE pokemon_cache SET data = ? WHERE id = ?", (compact, row_id))
+            compacted += 1
+    print(f"✅ {compacted} entradas de 'pokemon_cache' compactadas")
+except sqlite3.OperationalError as e:
+    print(f"⚠️  Tabla 'pokemon_cache' no disponible: {e}")
+
 # Commit changes
 conn.commit()
 
+# Reclaim space freed by compacted cache entries
+cursor.execute("VACUUM")
+
 # Show table structure
 cursor.execute("PRAGMA table_info(recipes)")
 columns = cursor.fetchall()
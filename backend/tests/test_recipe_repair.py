@@ -0,0 +1,128 @@
+import pytest
+from app.services.recipe_repair import RecipeRepairService
+
+
+@pytest.mark.parametrize("value, expected", [
+    (45, 45),
+    (50.4, 50),
+    (-5, 0),
+    ("45 minutos", 45),
+    ("90 min aprox", 90),
+    ("1 hora 30 minutos", 90),
+    ("1h30", 90),
+    ("1h 20m", 80),
+    ("1 hora y 15", 75),
+    ("2 horas", 120),
+    ("1.5 horas", 90),
+    ("1,5 horas", 90),
+    ("1/2 hora", 30),
+    ("1 1/2 horas", 90),
+    ("media hora", 30),
+    ("una hora y media", 90),
+    ("2 horas y media", 150),
+    ("cuarto de hora", 15),
+    ("10 min + 1 hora de refrigeración", 70),
+    ("30-40", 40),
+    ("unos minutos", None),
+    ("1/0 hora", None),
+    ("", None),
+    (True, None),
+    (None, None),
+])
+def test_parse_prep_time(value, expected):
+    assert RecipeRepairService.parse_prep_time(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Fácil", "Fácil"),
+    ("facil", "Fácil"),
+    ("EASY", "Fácil"),
+    ("muy fácil", "Fácil"),
+    ("medium", "Medio"),
+    ("Intermedio", "Medio"),
+    ("Medio-alto", "Medio"),
+    ("difícil", "Difícil"),
+    ("Avanzado", "Difícil"),
+    ("no muy dificil", None),
+    ("ni fácil ni difícil", None),
+    ("???", None),
+    ("", None),
+    (None, None),
+    (3, None),
+])
+def test_normalize_difficulty(value, expected):
+    assert RecipeRepairService.normalize_difficulty(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1. Mezclar harina. 2. Hornear 20 min a 180°C. 3) Decorar",
+     ["Mezclar harina.", "Hornear 20 min a 180°C.", "Decorar"]),
+    ("Paso 1: batir\nPaso 2: hornear\n- enfriar", ["batir", "hornear", "enfriar"]),
+    ("Batir los huevos", ["Batir los huevos"]),
+    ("Hornear a 180°C por 25 min", ["Hornear a 180°C por 25 min"]),
+    ([{"step": 1, "instruction": "Batir"}, "2. Hornear", "", None], ["Batir", "Hornear"]),
+    (["Batir", "Hornear"], ["Batir", "Hornear"]),
+    ("", []),
+    (None, []),
+    (42, []),
+])
+def test_split_instructions(value, expected):
+    assert RecipeRepairService.split_instructions(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (["200g harina"], [{"item": "200g harina", "quantity": "", "notes": ""}]),
+    ("- harina\n- azúcar; huevos", [
+        {"item": "harina", "quantity": "", "notes": ""},
+        {"item": "azúcar", "quantity": "", "notes": ""},
+        {"item": "huevos", "quantity": "", "notes": ""},
+    ]),
+    ([{"item": "azúcar", "quantity": "100 g"}], [{"item": "azúcar", "quantity": "100 g", "notes": ""}]),
+    ([{"item": "sal", "quantity": "1 pizca", "notes": None}], [{"item": "sal", "quantity": "1 pizca", "notes": ""}]),
+    ([{"item": "leche", "quantity": "1 taza", "notes": "tibia"}], [{"item": "leche", "quantity": "1 taza", "notes": "tibia"}]),
+    ([{"quantity": "2"}, 7, ""], []),
+    (None, []),
+])
+def test_normalize_ingredients(value, expected):
+    assert RecipeRepairService.normalize_ingredients(value) == expected
+
+
+@pytest.mark.parametrize("prep_time, expected", [
+    ("45 minutos", 45),
+    ("media hora", 30),
+    ("unos minutos", None),
+    (30, 30),
+])
+def test_repair_prep_time(prep_time, expected):
+    repaired, _ = RecipeRepairService().repair({"prep_time": prep_time})
+    assert repaired["prep_time"] == expected
+
+
+VALID_RECIPE = {
+    "title": "Tarta Pikachu",
+    "description": "Una tarta eléctrica",
+    "difficulty": "Fácil",
+    "prep_time": 45,
+    "ingredients": [{"item": "harina", "quantity": "200 g", "notes": ""}],
+    "instructions": ["Mezclar", "Hornear"],
+}
+
+
+@pytest.mark.parametrize("changes, refine_avoided", [
+    # Passed the original validation as is: no refine to avoid
+    ({"prep_time": "45 minutos"}, False),
+    ({"prep_time": "unos minutos"}, False),
+    ({"difficulty": "facil"}, False),
+    # Would have been refined by the LLM before local repairs
+    ({"instructions": "1. Mezclar 2. Hornear"}, True),
+    ({"ingredients": "harina; azúcar"}, True),
+])
+def test_repair_node_counts_only_avoided_refines(changes, refine_avoided):
+    from app.services.recipe_repair import recipe_repair_service
+    from app.workflows.nodes import repair_recipe_node, validate_recipe_node
+
+    before = recipe_repair_service.stats()["refines_avoided"]
+    state = repair_recipe_node({"raw_recipe": dict(VALID_RECIPE, **changes), "errors": []})
+
+    assert recipe_repair_service.stats()["refines_avoided"] - before == int(refine_avoided)
+    assert validate_recipe_node(state)["errors"] == []
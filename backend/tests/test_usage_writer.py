@@ -0,0 +1,58 @@
+import time
+
+from app.services.usage_writer import UsageEventWriter
+
+
+class FlakyBatchWriter:
+    """Fails the first `failures` writes, then records every batch it is given."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.events = []
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("database is locked")
+        self.events.extend(batch)
+
+
+def test_failed_batch_is_retried():
+    write_batch = FlakyBatchWriter(failures=2)
+    writer = UsageEventWriter(write_batch, batch_size=10, interval_seconds=60, max_attempts=3, backoff_seconds=0)
+    for event in range(3):
+        writer.submit(event)
+
+    writer.flush()
+
+    assert write_batch.events == [0, 1, 2]
+    assert (writer.written, writer.requeued, writer.failed) == (3, 0, 0)
+    writer.close()
+
+
+def test_batch_that_keeps_failing_is_requeued_in_order():
+    write_batch = FlakyBatchWriter(failures=2)
+    writer = UsageEventWriter(write_batch, batch_size=10, interval_seconds=60, max_attempts=2, backoff_seconds=0)
+    writer.submit(0)
+    writer.submit(1)
+
+    writer.flush()
+    writer.submit(2)
+    assert writer.requeued == 2
+
+    writer.close()
+    assert write_batch.events == [0, 1, 2]
+    assert writer.failed == 0
+
+
+def test_close_drops_what_cannot_be_written():
+    write_batch = FlakyBatchWriter(failures=100)
+    writer = UsageEventWriter(write_batch, batch_size=10, interval_seconds=0.01, max_attempts=2, backoff_seconds=0)
+    writer.submit(0)
+    time.sleep(0.05)
+
+    writer.close()
+
+    assert write_batch.events == []
+    assert writer.failed == 1
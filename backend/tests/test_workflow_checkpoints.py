@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from app.workflows import recipe_graph
+
+
+class _Snapshot:
+    next = ("save_recipe",)
+    values = {"pokemon_id": 25, "user_preferences": {"diet": "vegan"}, "generate_image": True}
+
+
+class _InterruptedWorkflow:
+    async def aget_state(self, config):
+        return _Snapshot()
+
+
+@pytest.fixture
+def interrupted_run(monkeypatch):
+    monkeypatch.setattr(recipe_graph, "_checkpointer", object())
+    monkeypatch.setattr(recipe_graph, "recipe_workflow", _InterruptedWorkflow())
+
+
+def test_resume_with_same_inputs(interrupted_run):
+    workflow_input, config = asyncio.run(recipe_graph._start_or_resume(25, {"diet": "vegan"}, True, "run-1"))
+    assert workflow_input is None
+    assert config == {"configurable": {"thread_id": "run-1"}}
+
+
+@pytest.mark.parametrize("pokemon_id, preferences, generate_image", [
+    (1, {"diet": "vegan"}, True),
+    (25, None, True),
+    (25, {"diet": "keto"}, True),
+    (25, {"diet": "vegan"}, False),
+])
+def test_resume_with_different_inputs(interrupted_run, pokemon_id, preferences, generate_image):
+    with pytest.raises(recipe_graph.RunMismatchError):
+        asyncio.run(recipe_graph._start_or_resume(pokemon_id, preferences, generate_image, "run-1"))
+
+
+def test_prune_drops_only_expired_runs(tmp_path):
+    async def run():
+        await recipe_graph.open_workflow_checkpoints(str(tmp_path / "checkpoints.db"))
+        try:
+            for thread_id, age_hours in (("expired", 200), ("recent", 1)):
+                checkpoint = empty_checkpoint()
+                checkpoint["ts"] = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).isoformat()
+                config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+                await recipe_graph._checkpointer.aput(config, checkpoint, {}, {})
+
+            deleted = await recipe_graph.prune_workflow_checkpoints(ttl_hours=168)
+            left = {c.config["configurable"]["thread_id"] async for c in recipe_graph._checkpointer.alist(None)}
+            return deleted, left
+        finally:
+            await recipe_graph.close_workflow_checkpoints()
+
+    assert asyncio.run(run()) == (1, {"recent"})
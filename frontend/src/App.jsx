@@ -8,7 +8,7 @@ import DessertSelector from './components/DessertSelector';
 import RecipeCard from './components/RecipeCard';
 import UsageDashboard from './components/UsageDashboard';
 import { generateRecipe, listRecipes } from './services/api';
-import { useQuery, useMutation } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation } from '@tanstack/react-query';
 import { useWindowSize } from './hooks/useWindowSize';
 
 // Lazy load RecipeDetail modal (only loaded when needed)
@@ -78,11 +78,22 @@ function AppContent() {
   // Use optimized window size hook
   const windowSize = useWindowSize();
 
-  // Fetch saved recipes
-  const { data: savedRecipes, refetch: refetchRecipes } = useQuery({
+  // Fetch saved recipes (summary view, one keyset-paginated page at a time)
+  const {
+    data: savedRecipePages,
+    refetch: refetchRecipes,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
     queryKey: ['recipes'],
-    queryFn: () => listRecipes(0, 10),
+    queryFn: ({ pageParam }) => listRecipes(0, 10, null, { view: 'summary', cursor: pageParam }),
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
   });
+  const savedRecipes = savedRecipePages && {
+    recipes: savedRecipePages.pages.flatMap((page) => page.recipes),
+  };
 
   // Generate recipe mutation
   const generateMutation = useMutation({
@@ -408,7 +419,7 @@ function AppContent() {
                   key={recipe.id}
                   initial={{ opacity: 0, y: 20 }}
                   animate={{ opacity: 1, y: 0 }}
-                  transition={{ delay: index * 0.1 }}
+                  transition={{ delay: (index % 10) * 0.1 }}
                 >
                   <RecipeCard
                     recipe={recipe}
@@ -417,6 +428,20 @@ function AppContent() {
                 </motion.div>
               ))}
             </div>
+            {hasNextPage && (
+              <div className="text-center mt-6">
+                <motion.button
+                  onClick={() => fetchNextPage()}
+                  disabled={isFetchingNextPage}
+                  className="inline-flex items-center gap-2 bg-white px-6 py-3 rounded-full shadow-retro border-4 border-pokedex-dark font-pokemon text-md text-pokedex-dark disabled:opacity-50"
+                  whileHover={{ scale: 1.05 }}
+                  whileTap={{ scale: 0.95 }}
+                >
+                  {isFetchingNextPage ? <Loader2 className="animate-spin" size={18} /> : <Sparkles size={18} />}
+                  CARGAR MAS RECETAS
+                </motion.button>
+              </div>
+            )}
           </motion.section>
         )}
       </main>
@@ -1,6 +1,7 @@
 import { Clock, ChefHat, Sparkles, Star, Zap } from 'lucide-react';
 import { motion } from 'framer-motion';
 import { memo } from 'react';
+import { resolveImageUrl } from '../services/api';
 
 export default memo(function RecipeCard({ recipe, onViewDetails }) {
   return (
@@ -40,7 +41,12 @@ export default memo(function RecipeCard({ recipe, onViewDetails }) {
         {recipe.image_url ? (
           <div className="relative group/image">
             <img
-              src={recipe.image_url}
+              src={resolveImageUrl(recipe.image_variants?.[512] || recipe.image_url)}
+              srcSet={recipe.image_variants
+                ? `${resolveImageUrl(recipe.image_variants[256])} 256w, ${resolveImageUrl(recipe.image_variants[512])} 512w`
+                : undefined}
+              sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+              loading="lazy"
               alt={recipe.recipe_title}
               className="w-full h-56 object-cover"
             />
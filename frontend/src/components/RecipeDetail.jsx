@@ -1,7 +1,7 @@
 import { X, Clock, ChefHat, ShoppingCart, ImageIcon, Sparkles, Star, Zap } from 'lucide-react';
 import { useState, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
-import { generateRecipeImage } from '../services/api';
+import { generateRecipeImage, waitForImageJob, getRecipe, resolveImageUrl } from '../services/api';
 
 export default function RecipeDetail({ recipe, onClose }) {
   const [fullImageUrl, setFullImageUrl] = useState(null);
@@ -21,6 +21,15 @@ export default function RecipeDetail({ recipe, onClose }) {
     };
   }, []);
 
+  // Las tarjetas de la colección traen solo el resumen; cargar la receta completa
+  useEffect(() => {
+    if (recipe && recipe.id && recipe.ingredients === undefined) {
+      getRecipe(recipe.id)
+        .then((fullRecipe) => setCurrentRecipe((current) => ({ ...current, ...fullRecipe })))
+        .catch((error) => console.error('Error loading recipe:', error));
+    }
+  }, [recipe]);
+
   if (!currentRecipe) return null;
 
   const handleImageClick = (imageUrl) => {
@@ -34,8 +43,15 @@ export default function RecipeDetail({ recipe, onClose }) {
   const handleGenerateImage = async () => {
     setIsGenerating(true);
     try {
-      const updatedRecipe = await generateRecipeImage(currentRecipe.id);
-      setCurrentRecipe(updatedRecipe);
+      const job = await waitForImageJob((await generateRecipeImage(currentRecipe.id)).id);
+      if (job.status === 'failed') {
+        throw new Error(job.last_error);
+      }
+      setCurrentRecipe((current) => ({
+        ...current,
+        image_url: job.image_url,
+        image_variants: job.image_variants,
+      }));
     } catch (error) {
       console.error('Error generating image:', error);
       alert('Error generando la imagen. Por favor intenta nuevamente.');
@@ -136,10 +152,10 @@ export default function RecipeDetail({ recipe, onClose }) {
                 initial={{ scale: 0.9, opacity: 0 }}
                 animate={{ scale: 1, opacity: 1 }}
                 whileHover={{ scale: 1.02 }}
-                onClick={() => handleImageClick(currentRecipe.image_url)}
+                onClick={() => handleImageClick(resolveImageUrl(currentRecipe.image_url))}
               >
                 <img
-                  src={currentRecipe.image_url}
+                  src={resolveImageUrl(currentRecipe.image_url)}
                   alt={currentRecipe.recipe_title}
                   className="w-full h-80 object-cover"
                 />
@@ -22,19 +22,88 @@ export const getPokemon = async (pokemonId) => {
   return response.data;
 };
 
-// Recipe endpoints
-export const generateRecipe = async (pokemonId, preferences = null, generateImage = false) => {
-  const response = await api.post('/recipes/generate', {
-    pokemon_id: pokemonId,
-    preferences,
-    generate_image: generateImage
+export const getPokemonBatch = async (pokemonIds) => {
+  const response = await api.get('/pokemon/batch', {
+    params: { ids: pokemonIds.join(',') }
   });
   return response.data;
 };
 
-export const listRecipes = async (skip = 0, limit = 20, pokemonId = null) => {
-  const params = { skip, limit };
+// Recipe endpoints
+// A failed run is checkpointed on the server; retrying with its run_id resumes it
+// after the last completed step instead of generating the recipe again
+export const generateRecipe = async (pokemonId, preferences = null, generateImage = false, resumeAttempts = 1) => {
+  let runId = null;
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const response = await api.post('/recipes/generate', {
+        pokemon_id: pokemonId,
+        preferences,
+        generate_image: generateImage,
+        run_id: runId
+      });
+      return response.data;
+    } catch (error) {
+      const failedRunId = error.response?.data?.detail?.run_id;
+      if (!failedRunId || attempt >= resumeAttempts) {
+        throw error;
+      }
+      runId = failedRunId;
+    }
+  }
+};
+
+// Streams generation progress over Server-Sent Events.
+// onEvent receives (eventName, data) for "stage", "recipe_partial", "complete" and "error".
+export const generateRecipeStream = async (pokemonId, preferences = null, generateImage = false, onEvent = () => {}) => {
+  const response = await fetch(`${API_URL}/api/recipes/generate/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      pokemon_id: pokemonId,
+      preferences,
+      generate_image: generateImage
+    })
+  });
+  if (!response.ok) {
+    throw new Error(`Recipe stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let eventName = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event: ')) eventName = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : null;
+      onEvent(eventName, payload);
+      if (eventName === 'complete') result = payload;
+      if (eventName === 'error') throw new Error(payload?.message || 'Recipe generation failed');
+    }
+  }
+
+  return result;
+};
+
+export const listRecipes = async (skip = 0, limit = 20, pokemonId = null, { view = 'full', cursor = null } = {}) => {
+  const params = { skip, limit, view };
   if (pokemonId) params.pokemon_id = pokemonId;
+  if (cursor) params.cursor = cursor;
 
   const response = await api.get('/recipes/', { params });
   return response.data;
@@ -50,11 +119,36 @@ export const deleteRecipe = async (recipeId) => {
   return response.data;
 };
 
+// Queues image generation; returns the job to poll with waitForImageJob
 export const generateRecipeImage = async (recipeId) => {
   const response = await api.post(`/recipes/${recipeId}/generate-image`);
   return response.data;
 };
 
+export const getImageJob = async (jobId) => {
+  const response = await api.get(`/recipes/image-jobs/${jobId}`);
+  return response.data;
+};
+
+// Poll an image job until it is done or failed
+export const waitForImageJob = async (jobId, intervalMs = 2000) => {
+  for (;;) {
+    const job = await getImageJob(jobId);
+    if (job.status === 'done' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
+// Image URLs from the API are relative (/api/images/...); resolve them against the backend
+export const resolveImageUrl = (url) => {
+  if (url && url.startsWith('/')) {
+    return `${API_URL}${url}`;
+  }
+  return url;
+};
+
 // Usage endpoints
 export const getUsageSummary = async () => {
   const response = await api.get('/usage/summary');
@@ -70,6 +164,11 @@ export const getUsageHistory = async (startDate = null, endDate = null, limit =
   return response.data;
 };
 
+export const getUsageTimeseries = async (period = 'day', limit = 30) => {
+  const response = await api.get('/usage/timeseries', { params: { period, limit } });
+  return response.data;
+};
+
 export const getUsageQuota = async () => {
   const response = await api.get('/usage/quota');
   return response.data;